@@ -24,7 +24,9 @@ engine = create_engine(
 )
 
 # Criar session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objetos seguem legiveis apos o commit sem SELECT de recarga
+# (o perfil salvo pelo scraper e lido no event loop, fora da thread do commit).
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def get_db() -> Session:
@@ -50,6 +52,9 @@ def init_db():
         Base.metadata.create_all(bind=engine)
         _ensure_profiles_full_name_column()
         _ensure_interactions_post_url_column()
+        _ensure_posts_post_url_unique_index()
+        _ensure_interactions_dedup_index()
+        _ensure_instagram_sessions_active_index()
         logger.info("✅ Banco de dados inicializado com sucesso")
     except Exception as e:
         logger.error(f"❌ Erro ao inicializar banco de dados: {e}")
@@ -132,6 +137,68 @@ def _ensure_interactions_post_url_column() -> None:
         logger.warning("⚠️ Não foi possível garantir interactions.post_url: %s", e)
 
 
+def _ensure_posts_post_url_unique_index() -> None:
+    """
+    Garante unique em posts.post_url (alvo do upsert de posts) para bases antigas.
+    """
+    try:
+        inspector = inspect(engine)
+        if "posts" not in inspector.get_table_names():
+            return
+
+        with engine.begin() as conn:
+            conn.execute(
+                text("CREATE UNIQUE INDEX IF NOT EXISTS uq_posts_post_url ON posts (post_url)")
+            )
+        logger.info("✅ Unique de posts.post_url garantido com sucesso")
+    except Exception as e:
+        logger.warning("⚠️ Não foi possível garantir unique de posts.post_url: %s", e)
+
+
+def _ensure_interactions_dedup_index() -> None:
+    """
+    Garante índice composto (post_id, user_url, interaction_type) usado no dedup de interações.
+    """
+    try:
+        inspector = inspect(engine)
+        if "interactions" not in inspector.get_table_names():
+            return
+
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_interactions_post_id_user_url_type "
+                    "ON interactions (post_id, user_url, interaction_type)"
+                )
+            )
+        logger.info("✅ Índice de dedup de interactions garantido com sucesso")
+    except Exception as e:
+        logger.warning("⚠️ Não foi possível garantir índice de dedup de interactions: %s", e)
+
+
+def _ensure_instagram_sessions_active_index() -> None:
+    """
+    Garante índice parcial das sessões ativas do Instagram (busca/desativação por username).
+    """
+    try:
+        inspector = inspect(engine)
+        if "instagram_sessions" not in inspector.get_table_names():
+            return
+
+        active_filter = "is_active IS TRUE" if engine.dialect.name == "postgresql" else "is_active = 1"
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_instagram_sessions_active_username "
+                    "ON instagram_sessions (lower(instagram_username)) "
+                    f"WHERE {active_filter}"
+                )
+            )
+        logger.info("✅ Índice de sessões ativas do Instagram garantido com sucesso")
+    except Exception as e:
+        logger.warning("⚠️ Não foi possível garantir índice de instagram_sessions: %s", e)
+
+
 def drop_db():
     """
     Remove todas as tabelas do banco de dados.
@@ -2,7 +2,7 @@
 Modelos SQLAlchemy para persistência de dados do Instagram.
 """
 
-from sqlalchemy import Column, String, Integer, Text, Boolean, DateTime, ForeignKey, JSON, Enum, UniqueConstraint
+from sqlalchemy import Column, String, Integer, Text, Boolean, DateTime, ForeignKey, JSON, Enum, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -52,12 +52,14 @@ class Profile(Base):
 class Post(Base):
     """Modelo para posts do Instagram."""
     __tablename__ = "posts"
+    __table_args__ = (
+        UniqueConstraint("post_url", name="uq_posts_post_url"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     profile_id = Column(String(36), ForeignKey("profiles.id"), nullable=False, index=True)
-    post_url = Column(String(500), unique=True, nullable=False)
     post_id = Column(String(255), nullable=True)  # ID nativo do Instagram
-    post_url = Column(String(500), nullable=True, index=True)
+    post_url = Column(String(500), nullable=True)
     caption = Column(Text, nullable=True)
     like_count = Column(Integer, default=0)
     comment_count = Column(Integer, default=0)
@@ -86,6 +88,8 @@ class Interaction(Base):
             "interaction_type",
             name="uq_interactions_post_url_user_url_type",
         ),
+        # Dedup de interacoes legadas (sem post_url), resolvidas por post_id.
+        Index("ix_interactions_post_id_user_url_type", "post_id", "user_url", "interaction_type"),
     )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
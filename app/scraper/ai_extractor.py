@@ -3,15 +3,23 @@ Extrator IA Híbrido para processamento de dados do Instagram.
 Usa OpenAI Vision + GPT para extrair dados estruturados de screenshots e HTML.
 """
 
+import base64
 import json
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from openai import AsyncOpenAI, RateLimitError
 from config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _image_data_url(screenshot: Union[str, bytes]) -> str:
+    """Monta o data URL da imagem; bytes crus sao codificados so aqui."""
+    if isinstance(screenshot, (bytes, bytearray)):
+        screenshot = base64.b64encode(screenshot).decode("ascii")
+    return f"data:image/png;base64,{screenshot}"
+
+
 class AIExtractor:
     """
     Extrator que usa IA para processar screenshots e HTML.
@@ -85,7 +93,7 @@ class AIExtractor:
 
     async def extract_profile_info(
         self,
-        screenshot_base64: Optional[str] = None,
+        screenshot_base64: Optional[Union[str, bytes]] = None,
         html_content: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
@@ -142,7 +150,7 @@ class AIExtractor:
                     0,
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"},
+                        "image_url": {"url": _image_data_url(screenshot_base64)},
                     },
                 )
 
@@ -181,7 +189,7 @@ class AIExtractor:
 
     async def extract_posts_info(
         self,
-        screenshot_base64: Optional[str] = None,
+        screenshot_base64: Optional[Union[str, bytes]] = None,
         html_content: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
@@ -238,7 +246,7 @@ class AIExtractor:
                     0,
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"},
+                        "image_url": {"url": _image_data_url(screenshot_base64)},
                     },
                 )
 
@@ -270,9 +278,101 @@ class AIExtractor:
             logger.error(f"❌ Erro ao extrair informações dos posts: {e}")
             raise
 
+    async def extract_posts_info_batch(
+        self,
+        items: List[Dict[str, Any]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Extrai os dados de varios posts (um por pagina) em uma unica chamada a IA.
+
+        Args:
+            items: Lista de {"post_url", "screenshot_base64", "html_content"}
+
+        Returns:
+            Dicionário post_url (sem barra final) -> dados extraídos do post
+        """
+        if not items:
+            return {}
+        try:
+            logger.info("🧠 Extraindo %s posts com IA em lote...", len(items))
+
+            content: List[Dict[str, Any]] = [
+                {
+                    "type": "text",
+                    "text": f"""Abaixo estao {len(items)} paginas de posts do Instagram, cada uma
+                    identificada pela sua URL. Para CADA post, extraia:
+
+                    1. Caption/Descrição
+                    2. Número de likes
+                    3. Número de comentários
+                    4. Data do post (se visível)
+
+                    Retorne APENAS um JSON válido com um objeto por post, repetindo a URL recebida:
+                    {{
+                        "posts": [
+                            {{
+                                "post_url": "string (a URL informada)",
+                                "caption": "string ou null",
+                                "like_count": number,
+                                "comment_count": number,
+                                "posted_at": "ISO datetime ou null",
+                                "confidence": number entre 0 e 1
+                            }}
+                        ]
+                    }}
+                    """,
+                }
+            ]
+            for index, item in enumerate(items, start=1):
+                content.append({"type": "text", "text": f"\nPost {index}: {item['post_url']}"})
+                if item.get("screenshot_base64"):
+                    content.append(
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": _image_data_url(item["screenshot_base64"])},
+                        }
+                    )
+                if item.get("html_content"):
+                    content.append(
+                        {
+                            "type": "text",
+                            "text": f"HTML do post {index}:\n{item['html_content'][:5000]}",
+                        }
+                    )
+
+            response = await self._chat_completion_with_fallback(
+                model=self.model_text,
+                messages=[{"role": "user", "content": content}],
+                temperature=self.temperature_text,
+            )
+
+            response_text = response.choices[0].message.content
+            posts = json.loads(response_text).get("posts") or []
+            posts = [post for post in posts if isinstance(post, dict)]
+
+            by_url: Dict[str, Dict[str, Any]] = {}
+            for post in posts:
+                post_url = str(post.get("post_url") or "").rstrip("/")
+                if post_url:
+                    by_url[post_url] = post
+            # Se a IA nao repetiu as URLs, associa pela ordem quando a contagem bate.
+            if len(posts) == len(items):
+                for item, post in zip(items, posts):
+                    by_url.setdefault(item["post_url"].rstrip("/"), post)
+
+            logger.info("✅ Posts extraídos em lote: %s/%s", len(by_url), len(items))
+            return by_url
+
+        except json.JSONDecodeError as e:
+            logger.error("❌ Erro ao fazer parse do JSON da IA: %s", e)
+            raise
+        except Exception as e:
+            logger.error("❌ Erro ao extrair posts em lote: %s", e)
+            raise
+
     async def extract_comments(
         self,
-        screenshot_base64: Optional[str] = None,
+        screenshot_base64: Optional[Union[str, bytes]] = None,
         html_content: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
@@ -330,7 +430,7 @@ class AIExtractor:
                     0,
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"},
+                        "image_url": {"url": _image_data_url(screenshot_base64)},
                     },
                 )
 
@@ -363,7 +463,7 @@ class AIExtractor:
 
     async def extract_user_info(
         self,
-        screenshot_base64: Optional[str] = None,
+        screenshot_base64: Optional[Union[str, bytes]] = None,
         html_content: Optional[str] = None,
         username: Optional[str] = None,
     ) -> Dict[str, Any]:
@@ -413,7 +513,7 @@ class AIExtractor:
                     0,
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"},
+                        "image_url": {"url": _image_data_url(screenshot_base64)},
                     },
                 )
 
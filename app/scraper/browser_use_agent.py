@@ -5,16 +5,23 @@ Browser Use usa IA para tomar decisões autônomas durante a navegação.
 
 import logging
 import asyncio
+import copy
+import functools
+import hashlib
 import inspect
 import json
+import random
+import re
 import tempfile
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Union
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, Dict, Any, List, NamedTuple, Union
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 from datetime import datetime
 from uuid import uuid4
 
-from browser_use import Agent, BrowserSession, ChatOpenAI
+from browser_use import BrowserSession
 import httpx
 import websockets
 from config import settings
@@ -22,9 +29,378 @@ from app.models import InstagramSession, InvestingSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
+if TYPE_CHECKING:
+    from browser_use import Agent, ChatOpenAI
+
 logger = logging.getLogger(__name__)
 
 
+def _compile_markers(*markers: str) -> "re.Pattern[str]":
+    """Compila marcadores de erro em um unico regex case-insensitive."""
+    return re.compile("|".join(re.escape(marker) for marker in markers), re.IGNORECASE)
+
+
+_PROTOCOL_ERROR_RE = _compile_markers(
+    "protocol error",
+    "reserved bits must be 0",
+    "connectionclosederror",
+    "client is stopping",
+    "sent 1002",
+)
+_RATE_LIMIT_ERROR_RE = _compile_markers(
+    "rate limit",
+    "rate_limit_exceeded",
+    "too many requests",
+    "error code: 429",
+    "http/1.1 429",
+    "modelratelimiterror",
+    "tokens per min",
+    "tpm",
+)
+_RETRY_LOGIN_ERROR_RE = _compile_markers(
+    "root cdp client not initialized",
+    "failed to establish cdp connection",
+    "connectionclosederror",
+    "protocol error",
+    "reserved bits must be 0",
+    "sent 1002",
+    "client is stopping",
+    "websocket",
+    "navigation failed",
+)
+
+_RETRYABLE_ERROR_RE = _compile_markers(
+    "http 500",
+    "connection",
+    "timeout",
+    "websocket",
+    "failed to establish",
+    "protocol error",
+    "reserved bits",
+    "client is stopping",
+)
+
+_JSON_DECODER = json.JSONDecoder()
+# Encoders reutilizaveis e compactos (sem espacos) para o storage_state.
+_COMPACT_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+_FINGERPRINT_JSON_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=str)
+_JSON_START_RE = re.compile(r"[\[{]")
+# Limite de entradas do cache de resultados de scrape (LRU).
+_SCRAPE_CACHE_MAX_ENTRIES = 64
+
+
+# Prompts dos agentes; formatados uma vez por chamada (fora do loop de retentativas).
+_LOGIN_TASK_TMPL = """
+Voce esta em um navegador controlado por IA.
+Acesse https://www.instagram.com/accounts/login/.
+
+Passos:
+1) Se aparecer um modal de cookies, clique em "Allow all cookies" (ou equivalente).
+2) Preencha o campo de usuario com: {username}
+3) Preencha o campo de senha com: {password}
+4) Clique em "Log in"/"Entrar".
+5) Se aparecer a tela "Save your login info?", clique em "Save info".
+6) Aguarde o feed inicial carregar e confirme que o login foi bem sucedido.
+7) Se aparecer mensagem de login invalido (senha incorreta/usuario invalido), responda com "LOGIN_INVALID" e pare.
+8) Se houver challenge/2FA, pare e reporte erro.
+
+Importante:
+- Use apenas a aba atual (nao abrir nova aba).
+- Aguarde o DOM carregar; se ficar vazio, aguarde alguns segundos e recarregue uma vez.
+- Nao clique em "Forgot password?"; se nao encontrar um botao claro de login, pressione Enter no campo de senha.
+
+Ao final, confirme sucesso com um texto curto: "LOGIN_OK".
+"""
+
+_PROFILE_POSTS_TASK_TMPL = """
+Você é um raspador de dados do Instagram. Extraia os primeiros {max_posts} posts do perfil.
+
+PERFIL:
+- URL: {profile_url}
+
+ESTRATÉGIA (obrigatória):
+1) Abra o perfil e aguarde carregar.
+2) Faça scroll suave 2-3 vezes para carregar o grid.
+3) Colete os primeiros {max_posts} links CANÔNICOS de posts a partir de anchors com href contendo "/p/" ou "/reel/".
+   - Não clique em ícones SVG, overlays de "Clip" ou elementos decorativos.
+   - Se precisar clicar, clique no link/anchor do post (href /p/... ou /reel/...), não no ícone.
+4) Para cada URL coletada:
+   a) Navegue para a URL do post na MESMA aba (new_tab: false).
+   b) Aguarde carregar.
+   c) Extraia:
+      - caption completa (ou null)
+      - like_count (inteiro ou null)
+      - comment_count (inteiro ou null)
+      - posted_at (texto visível ou null)
+5) Retorne JSON final com todos os posts coletados.
+
+FORMATO DE SAÍDA (JSON puro, sem texto extra):
+{{
+  "posts": [
+    {{
+      "post_url": "https://instagram.com/p/CODIGO/ ou https://instagram.com/reel/CODIGO/",
+      "caption": "texto da caption",
+      "like_count": 123,
+      "comment_count": 45,
+      "posted_at": "2 dias atrás" ou null
+    }}
+  ],
+  "total_found": {max_posts}
+}}
+
+REGRAS:
+- Se o perfil for privado: {{"posts": [], "total_found": 0, "error": "private_profile"}}
+- Use apenas a aba atual; não abra nova aba/janela.
+- Se não conseguir um campo, retorne null naquele campo.
+- Se não conseguir abrir um post, pule para o próximo.
+- Não invente dados.
+"""
+
+_LIKE_USERS_TASK_TMPL = """
+Você está em um navegador autenticado no Instagram.
+Sua tarefa é extrair os links dos perfis que curtiram um post.
+
+PASSOS:
+1) Acesse o post: {post_url}
+2) Aguarde a página carregar.
+3) Se houver modal de cookies, aceite.
+4) Localize e clique no link/botão de curtidas para abrir a lista de usuários.
+5) Se a lista abrir, role o modal/lista até coletar até {max_users} links únicos de perfis.
+6) Retorne os links no formato https://www.instagram.com/usuario/
+
+FORMATO DE SAÍDA (JSON):
+{{
+  "post_url": "{post_url}",
+  "likes_accessible": true,
+  "like_users": ["https://www.instagram.com/usuario1/"],
+  "total_collected": 1
+}}
+
+REGRAS:
+- Se não for possível abrir a lista de curtidas, retorne:
+  {{
+    "post_url": "{post_url}",
+    "likes_accessible": false,
+    "like_users": [],
+    "error": "likes_unavailable"
+  }}
+- Não abra nova aba.
+- Não invente links.
+"""
+
+_POST_COMMENTS_TASK_TMPL = """
+Voce esta em um navegador autenticado no Instagram.
+Sua tarefa e extrair comentarios de um post.
+
+PASSOS:
+1) Acesse o post: {post_url}
+2) Aguarde a pagina carregar.
+3) Se houver modal de cookies, aceite.
+4) Abra a secao de comentarios (incluindo "view all comments", "view more comments", "ver comentarios").
+5) Role/carregue mais comentarios por no maximo {max_scrolls} iteracoes.
+6) Colete ate {max_comments} comentarios visiveis.
+
+FORMATO DE SAIDA (JSON):
+{{
+  "post_url": "{post_url}",
+  "comments_accessible": true,
+  "comments": [
+    {{
+      "user_url": "https://www.instagram.com/usuario/",
+      "user_username": "usuario",
+      "comment_text": "texto do comentario",
+      "comment_likes": 0,
+      "comment_replies": 0,
+      "comment_posted_at": "2 h"
+    }}
+  ],
+  "total_collected": 1
+}}
+
+REGRAS:
+- Se nao for possivel abrir/carregar comentarios, retorne:
+  {{
+    "post_url": "{post_url}",
+    "comments_accessible": false,
+    "comments": [],
+    "error": "comments_unavailable"
+  }}
+- Nao abra nova aba.
+- Nao invente dados.
+- Se um campo nao estiver visivel, use null.
+- Retorne JSON puro no resultado final.
+"""
+
+_PROFILE_BASIC_INFO_TASK_TMPL = """
+Você está em um navegador autenticado no Instagram.
+Extraia os dados do perfil em JSON puro.
+
+PERFIL:
+- URL: {profile_url}
+
+PASSOS:
+1) Navegue para a URL do perfil na aba atual.
+2) Aguarde a página carregar.
+3) Se houver modal de cookies, aceite.
+4) Extraia os campos visíveis do perfil.
+
+FORMATO (JSON puro):
+{{
+  "username": "string ou null",
+  "full_name": "string ou null",
+  "bio": "string ou null",
+  "is_private": true/false,
+  "follower_count": número inteiro ou null,
+  "following_count": número inteiro ou null,
+  "post_count": número inteiro ou null,
+  "verified": true/false
+}}
+
+REGRAS:
+- Não abra nova aba.
+- Não invente dados.
+- Se não conseguir um campo, retorne null.
+"""
+
+_GENERIC_SCRAPE_TASK_TMPL = """
+Voce e um agente de scraping generico.
+
+URL alvo:
+- {url}
+
+Instrucoes do usuario (seguir literalmente):
+{prompt}
+
+Regras:
+- Use apenas a aba atual.
+- Nao invente dados.
+- Se algo falhar, retorne um JSON com campo "error".
+- Retorne no final APENAS o formato pedido pelo usuario.
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _agent_cls() -> type:
+    """Importa Agent sob demanda (puxa LLM/tokenizers; caro no import do modulo)."""
+    from browser_use import Agent
+
+    return Agent
+
+
+@functools.lru_cache(maxsize=None)
+def _chat_openai_cls() -> type:
+    """Importa ChatOpenAI sob demanda, apenas quando o primeiro agente e criado."""
+    from browser_use import ChatOpenAI
+
+    return ChatOpenAI
+
+
+@functools.lru_cache(maxsize=None)
+def _init_params(cls: type) -> Optional[frozenset]:
+    """
+    Nomes dos kwargs aceitos pelo construtor de ``cls``, calculado uma vez por processo.
+    Retorna None quando a assinatura aceita **kwargs ou nao pode ser inspecionada.
+    """
+    try:
+        params = inspect.signature(cls).parameters
+    except (TypeError, ValueError):
+        return None
+    if any(param.kind is inspect.Parameter.VAR_KEYWORD for param in params.values()):
+        return None
+    return frozenset(params)
+
+
+class _StorageStatePieces(NamedTuple):
+    """Campos do storage_state usados pelo agente, extraidos em uma unica passada."""
+
+    cookies: List[Dict[str, Any]]
+    session_info: Dict[str, Any]
+    reconnect_url: Optional[str]
+
+
+class _PreparedStorageState(NamedTuple):
+    """storage_state pre-processado para os metodos de scrape (campos, versao limpa e fingerprint)."""
+
+    pieces: _StorageStatePieces
+    clean: Optional[Union[Dict[str, Any], str]]
+    fingerprint: str
+
+
+class _AgentRunContext(NamedTuple):
+    """Dados fixos de uma chamada de scrape compartilhados por todas as tentativas."""
+
+    task: str
+    reconnect_url: Optional[str]
+    session_connect_url: Optional[str]
+    storage_fingerprint: str
+    storage_state_for_session: Optional[Union[Dict[str, Any], str]]
+    max_retries: int
+
+
+class _RetryableAgentError(Exception):
+    """Falha transitoria de uma tentativa do agente; o loop de retry aguarda e tenta de novo."""
+
+    def __init__(self, message: str, invalidate_cdp: bool = True):
+        super().__init__(message)
+        self.invalidate_cdp = invalidate_cdp
+
+
+class _BrowserSessionPool:
+    """
+    Pool LRU de BrowserSession ociosas, indexadas por (cdp_url, fingerprint do storage_state).
+    Evita reconectar o CDP e reinstalar cookies a cada chamada de scrape.
+    Cada sessao guarda o instante em que ficou ociosa (time.monotonic()).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(0, max_size)
+        self._idle: "OrderedDict[tuple, List[tuple[float, BrowserSession]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for sessions in self._idle.values())
+
+    def acquire(
+        self,
+        key: tuple,
+        max_idle_seconds: float,
+    ) -> tuple[Optional[BrowserSession], List[BrowserSession]]:
+        """
+        Retorna (sessao ociosa mais recente dentro do TTL, sessoes expiradas a desconectar).
+        """
+        sessions = self._idle.get(key)
+        if not sessions:
+            return None, []
+        idle_since, session = sessions.pop()
+        expired: List[BrowserSession] = []
+        if time.monotonic() - idle_since >= max_idle_seconds:
+            # A mais recente ja expirou: as mais antigas da mesma chave tambem.
+            expired = [session] + [older for _, older in sessions]
+            sessions.clear()
+            session = None
+        if not sessions:
+            del self._idle[key]
+        return session, expired
+
+    def release(self, key: tuple, session: BrowserSession) -> List[BrowserSession]:
+        """Devolve a sessao ao pool e retorna as sessoes despejadas pelo limite LRU."""
+        if self.max_size <= 0:
+            return [session]
+        self._idle.setdefault(key, []).append((time.monotonic(), session))
+        self._idle.move_to_end(key)
+        evicted: List[BrowserSession] = []
+        while len(self) > self.max_size:
+            oldest_key, oldest = next(iter(self._idle.items()))
+            evicted.append(oldest.pop(0)[1])
+            if not oldest:
+                del self._idle[oldest_key]
+        return evicted
+
+    def drain(self) -> List[BrowserSession]:
+        sessions = [session for group in self._idle.values() for _, session in group]
+        self._idle.clear()
+        return sessions
+
+
 class BrowserUseAgent:
     """
     Agente que usa Browser Use para navegar e interagir com o Instagram.
@@ -55,6 +431,13 @@ class BrowserUseAgent:
             log.propagate = True
         self._patch_websocket_compression(self.ws_compression_mode)
         logger.info("Browser Use WebSocket compression mode: %s", self.ws_compression_mode)
+        self._cached_cdp_url: Optional[tuple[str, float]] = None
+        self._llm: Optional["ChatOpenAI"] = None
+        self._fallback_llm: Optional["ChatOpenAI"] = None
+        self._prepared_storage_states: "OrderedDict[int, tuple[Any, _PreparedStorageState]]" = OrderedDict()
+        self._storage_state_files: "OrderedDict[str, str]" = OrderedDict()
+        self._scrape_cache: "OrderedDict[tuple, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._session_pool = _BrowserSessionPool(getattr(settings, "browser_use_session_pool_size", 2))
         if self.fallback_model:
             logger.info("Browser Use fallback model enabled: %s -> %s", self.model, self.fallback_model)
 
@@ -221,6 +604,24 @@ class BrowserUseAgent:
 
         return self._build_browserless_cdp_url()
 
+    async def _get_cached_cdp_url(self) -> str:
+        """
+        Retorna o endpoint CDP resolvido recentemente (TTL curto) para evitar um
+        GET em /json/version a cada scrape.
+        """
+        ttl = getattr(settings, "browser_use_cdp_url_ttl_seconds", 30.0)
+        now = time.monotonic()
+        cached = self._cached_cdp_url
+        if cached and now - cached[1] < ttl:
+            return cached[0]
+        cdp_url = await self._resolve_browserless_cdp_url()
+        self._cached_cdp_url = (cdp_url, now)
+        return cdp_url
+
+    def _invalidate_cdp_cache(self) -> None:
+        """Descarta o endpoint CDP em cache apos erro de protocolo/conexao."""
+        self._cached_cdp_url = None
+
     async def _create_browserless_session(self) -> Dict[str, Any]:
         if not settings.browserless_session_enabled:
             return {}
@@ -295,7 +696,8 @@ class BrowserUseAgent:
             try:
                 result = disconnect_fn()
                 if asyncio.iscoroutine(result):
-                    await result
+                    # Limita o tempo de desconexao para o cleanup nao travar o scrape.
+                    await asyncio.wait_for(result, timeout=10)
                 return
             except Exception as exc:
                 logger.warning("Erro ao desconectar sessao do browser: %s", exc)
@@ -362,22 +764,15 @@ class BrowserUseAgent:
         """
         clean_storage_state = self._sanitize_storage_state(storage_state)
         ws_connect_kwargs = self._get_ws_connect_kwargs()
-        session = None
-        base_kwargs = dict(cdp_url=cdp_url, storage_state=clean_storage_state)
-        ctor_attempts = []
-        if ws_connect_kwargs is not None:
-            ctor_attempts.append({**base_kwargs, "ws_connect_kwargs": ws_connect_kwargs, "keep_alive": True})
-        ctor_attempts.append({**base_kwargs, "keep_alive": True})
+        extra_kwargs: Dict[str, Any] = {"keep_alive": True}
         if ws_connect_kwargs is not None:
-            ctor_attempts.append({**base_kwargs, "ws_connect_kwargs": ws_connect_kwargs})
-        ctor_attempts.append({**base_kwargs})
-        for kwargs in ctor_attempts:
-            try:
-                session = BrowserSession(**kwargs)
-                break
-            except TypeError:
-                continue
-        if session is None:
+            extra_kwargs["ws_connect_kwargs"] = ws_connect_kwargs
+        accepted = _init_params(BrowserSession)
+        if accepted is not None:
+            extra_kwargs = {key: value for key, value in extra_kwargs.items() if key in accepted}
+        try:
+            session = BrowserSession(cdp_url=cdp_url, storage_state=clean_storage_state, **extra_kwargs)
+        except TypeError:
             session = BrowserSession(cdp_url=cdp_url, storage_state=clean_storage_state)
 
         keep_alive_setters = (
@@ -402,28 +797,156 @@ class BrowserUseAgent:
                 pass
         return session
 
-    def _create_agent(self, task: str, llm: ChatOpenAI, browser_session: BrowserSession) -> Agent:
+    def _get_cached_scrape(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Retorna copia de um resultado de scrape ainda dentro do TTL."""
+        entry = self._scrape_cache.get(key)
+        if entry is None:
+            return None
+        ttl = getattr(settings, "browser_use_result_cache_ttl_seconds", 60.0)
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= ttl:
+            del self._scrape_cache[key]
+            return None
+        self._scrape_cache.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def _store_cached_scrape(self, key: tuple, value: Dict[str, Any]) -> None:
+        if getattr(settings, "browser_use_result_cache_ttl_seconds", 60.0) <= 0:
+            return
+        self._scrape_cache[key] = (time.monotonic(), copy.deepcopy(value))
+        self._scrape_cache.move_to_end(key)
+        while len(self._scrape_cache) > _SCRAPE_CACHE_MAX_ENTRIES:
+            self._scrape_cache.popitem(last=False)
+
+    def _retry_wait_time(self, base: float, attempt: int) -> float:
+        """Backoff exponencial com jitter (limitado a 60s) entre retentativas de scrape."""
+        return round(min(60.0, base * (2 ** (attempt - 1))) + random.uniform(0, base), 1)
+
+    async def _run_agent(self, agent: "Agent") -> Any:
+        """
+        Executa o agente com timeout total. asyncio.TimeoutError e tratado como
+        retentavel pelos metodos de scrape; CancelledError sempre propaga.
+        """
+        timeout = getattr(settings, "browser_use_agent_timeout_seconds", 600.0)
+        try:
+            return await asyncio.wait_for(agent.run(), timeout=timeout)
+        except asyncio.TimeoutError as exc:
+            raise asyncio.TimeoutError(f"Browser Use agent timeout apos {timeout}s") from exc
+
+    def _build_agent_run_context(
+        self,
+        task: str,
+        prepared: _PreparedStorageState,
+        storage_state_file: Optional[str],
+        max_retries: int,
+    ) -> _AgentRunContext:
+        session_connect_url = prepared.pieces.session_info.get("connect")
+        return _AgentRunContext(
+            task=task,
+            reconnect_url=prepared.pieces.reconnect_url,
+            session_connect_url=session_connect_url if isinstance(session_connect_url, str) else None,
+            storage_fingerprint=prepared.fingerprint,
+            storage_state_for_session=storage_state_file or prepared.clean,
+            max_retries=max_retries,
+        )
+
+    def _storage_state_fingerprint(self, storage_state: Optional[Dict[str, Any]]) -> str:
+        payload = _FINGERPRINT_JSON_ENCODER.encode(storage_state or {})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _is_browser_session_alive(self, session: BrowserSession) -> bool:
+        """Comando CDP barato (Browser.getVersion) para confirmar que o navegador ainda responde."""
+        try:
+            result = await asyncio.wait_for(
+                self._send_cdp_command(session, "Browser.getVersion"),
+                timeout=5,
+            )
+        except Exception:
+            return False
+        return result is not None
+
+    async def _acquire_browser_session(
+        self,
+        pool_key: tuple,
+        storage_state: Optional[Union[Dict[str, Any], str]],
+        reuse: bool = True,
+    ) -> BrowserSession:
+        """
+        Retorna uma BrowserSession ociosa do pool para ``pool_key`` ou cria uma nova.
+
+        O Browserless encerra navegadores ociosos: sessoes paradas ha mais que
+        ``browser_use_session_pool_idle_seconds`` sao descartadas e a reutilizada
+        precisa responder a um comando CDP.
+        """
+        if reuse:
+            session, expired = self._session_pool.acquire(
+                pool_key,
+                getattr(settings, "browser_use_session_pool_idle_seconds", 30.0),
+            )
+            for stale in expired:
+                await self._detach_browser_session(stale)
+            if session is not None:
+                if await self._is_browser_session_alive(session):
+                    logger.info("Reutilizando BrowserSession do pool.")
+                    return session
+                logger.info("BrowserSession do pool nao respondeu ao CDP; criando uma nova.")
+                await self._detach_browser_session(session)
+        return self._create_browser_session(pool_key[0], storage_state=storage_state)
+
+    async def _release_browser_session(
+        self,
+        pool_key: tuple,
+        session: BrowserSession,
+        reusable: bool,
+    ) -> None:
+        """
+        Devolve a sessao ao pool quando a execucao terminou bem; caso contrario desconecta.
+        """
+        if not reusable:
+            await self._detach_browser_session(session)
+            return
+        for evicted in self._session_pool.release(pool_key, session):
+            await self._detach_browser_session(evicted)
+
+    async def close(self) -> None:
+        """Desconecta as BrowserSession do pool e remove os storage_state temporarios."""
+        for session in self._session_pool.drain():
+            await self._detach_browser_session(session)
+        while self._storage_state_files:
+            _, path = self._storage_state_files.popitem()
+            self._cleanup_storage_state_temp_file(path)
+
+    def _create_agent(self, task: str, llm: "ChatOpenAI", browser_session: BrowserSession) -> "Agent":
         possible_kwargs = {
             "task": task,
             "llm": llm,
             "browser_session": browser_session,
-            "fallback_llm": self._create_fallback_llm(),
+            "fallback_llm": self._get_fallback_llm(),
             "auto_close": False,
             "close_browser": False,
             "keep_browser_open": True,
             "keep_browser_session": True,
         }
-        try:
-            sig = inspect.signature(Agent.__init__)
-            allowed = {k: v for k, v in possible_kwargs.items() if k in sig.parameters}
-        except Exception:
-            allowed = possible_kwargs
-        return Agent(**allowed)
-
-    def _create_fallback_llm(self) -> Optional[ChatOpenAI]:
+        agent_cls = _agent_cls()
+        accepted = _init_params(agent_cls)
+        if accepted is None:
+            return agent_cls(**possible_kwargs)
+        return agent_cls(**{k: v for k, v in possible_kwargs.items() if k in accepted})
+
+    def _get_llm(self) -> "ChatOpenAI":
+        """Cliente LLM compartilhado entre agentes (criado uma unica vez)."""
+        llm = getattr(self, "_llm", None)
+        if llm is None:
+            llm = self._llm = _chat_openai_cls()(model=self.model, api_key=self.api_key)
+        return llm
+
+    def _get_fallback_llm(self) -> Optional["ChatOpenAI"]:
         if not self.fallback_model:
             return None
-        return ChatOpenAI(model=self.fallback_model, api_key=self.api_key)
+        llm = getattr(self, "_fallback_llm", None)
+        if llm is None:
+            llm = self._fallback_llm = _chat_openai_cls()(model=self.fallback_model, api_key=self.api_key)
+        return llm
 
     def _get_latest_session(
         self,
@@ -458,17 +981,63 @@ class BrowserUseAgent:
             return cookies
         return []
 
-    def _get_browserless_session_info(self, storage_state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    def _parse_storage_state(self, storage_state: Optional[Dict[str, Any]]) -> _StorageStatePieces:
         if not storage_state:
-            return {}
-        info = storage_state.get("_browserless_session")
-        return info if isinstance(info, dict) else {}
+            return _StorageStatePieces([], {}, None)
+        cookies = storage_state.get("cookies")
+        session_info = storage_state.get("_browserless_session")
+        reconnect_url = storage_state.get("_browserless_reconnect")
+        return _StorageStatePieces(
+            cookies if isinstance(cookies, list) else [],
+            session_info if isinstance(session_info, dict) else {},
+            reconnect_url if isinstance(reconnect_url, str) and reconnect_url else None,
+        )
 
-    def _get_browserless_reconnect_url(self, storage_state: Optional[Dict[str, Any]]) -> Optional[str]:
-        if not storage_state:
+    def _prepare_storage_state(self, storage_state: Optional[Dict[str, Any]]) -> _PreparedStorageState:
+        """
+        Extrai campos, versao limpa e fingerprint do storage_state uma unica vez.
+        Memoizado pela identidade do dict: chamadas seguidas com o mesmo storage_state
+        (ex.: varios posts do mesmo perfil) nao percorrem o estado de novo. O cache
+        assume que o dict nao e alterado in-place; o login sempre gera um dict novo.
+        """
+        key = id(storage_state)
+        cached = self._prepared_storage_states.get(key)
+        if cached is not None and cached[0] is storage_state:
+            self._prepared_storage_states.move_to_end(key)
+            return cached[1]
+
+        clean = self._sanitize_storage_state(storage_state)
+        prepared = _PreparedStorageState(
+            pieces=self._parse_storage_state(storage_state),
+            clean=clean,
+            fingerprint=self._storage_state_fingerprint(clean if isinstance(clean, dict) else None),
+        )
+        if storage_state is not None:
+            self._prepared_storage_states[key] = (storage_state, prepared)
+            while len(self._prepared_storage_states) > 8:
+                self._prepared_storage_states.popitem(last=False)
+        return prepared
+
+    def _ensure_storage_state_file(self, prepared: _PreparedStorageState) -> Optional[str]:
+        """
+        Retorna o arquivo temporario do storage_state, gravando-o apenas quando o
+        fingerprint ainda nao tem arquivo. Os arquivos vivem ate close() ou ate
+        sairem do cache (LRU).
+        """
+        if not isinstance(prepared.clean, dict):
             return None
-        reconnect_url = storage_state.get("_browserless_reconnect")
-        return reconnect_url if isinstance(reconnect_url, str) and reconnect_url else None
+        files = self._storage_state_files
+        path = files.get(prepared.fingerprint)
+        if path and Path(path).exists():
+            files.move_to_end(prepared.fingerprint)
+            return path
+        path = self._write_storage_state_temp_file(prepared.clean)
+        if path:
+            files[prepared.fingerprint] = path
+            while len(files) > 8:
+                _, old_path = files.popitem(last=False)
+                self._cleanup_storage_state_temp_file(old_path)
+        return path
 
     def _sanitize_storage_state(
         self,
@@ -502,7 +1071,7 @@ class BrowserUseAgent:
         temp_dir = Path(tempfile.gettempdir()) / "instagram-scraper"
         temp_dir.mkdir(parents=True, exist_ok=True)
         temp_file = temp_dir / f"browser_use_storage_{uuid4().hex}.json"
-        temp_file.write_text(json.dumps(clean_state), encoding="utf-8")
+        temp_file.write_text(_COMPACT_JSON_ENCODER.encode(clean_state), encoding="utf-8")
         return str(temp_file)
 
     def _cleanup_storage_state_temp_file(self, path: Optional[str]) -> None:
@@ -522,31 +1091,12 @@ class BrowserUseAgent:
     def _contains_protocol_error(self, text: str) -> bool:
         if not text:
             return False
-        lowered = text.lower()
-        markers = (
-            "protocol error",
-            "reserved bits must be 0",
-            "connectionclosederror",
-            "client is stopping",
-            "sent 1002",
-        )
-        return any(marker in lowered for marker in markers)
+        return _PROTOCOL_ERROR_RE.search(text) is not None
 
     def _contains_rate_limit_error(self, text: Optional[str]) -> bool:
         if not text:
             return False
-        lowered = str(text).lower()
-        markers = (
-            "rate limit",
-            "rate_limit_exceeded",
-            "too many requests",
-            "error code: 429",
-            "http/1.1 429",
-            "modelratelimiterror",
-            "tokens per min",
-            "tpm",
-        )
-        return any(marker in lowered for marker in markers)
+        return _RATE_LIMIT_ERROR_RE.search(str(text)) is not None
 
     def _history_errors_text(self, history: Any) -> str:
         if history is None:
@@ -586,67 +1136,89 @@ class BrowserUseAgent:
         return "parse_failed"
 
     def _extract_json_object_with_key(self, text: str, key: str) -> Optional[Dict[str, Any]]:
-        if not text:
+        # A chave precisa aparecer entre aspas no texto; sem ela nenhum objeto serve.
+        if not text or f'"{key}"' not in text:
             return None
-        decoder = json.JSONDecoder()
-        for idx, char in enumerate(text):
-            if char != "{":
-                continue
+        idx = text.find("{")
+        while idx != -1:
             try:
-                obj, _ = decoder.raw_decode(text[idx:])
-            except Exception:
-                continue
+                obj, _ = _JSON_DECODER.raw_decode(text, idx)
+            except ValueError:
+                obj = None
             if isinstance(obj, dict) and key in obj:
                 return obj
+            idx = text.find("{", idx + 1)
         return None
 
     def _extract_first_json_value(self, text: str) -> Optional[Any]:
         if not text:
             return None
-        decoder = json.JSONDecoder()
-        for idx, char in enumerate(text):
-            if char not in ("{", "["):
-                continue
+        match = _JSON_START_RE.search(text)
+        while match is not None:
             try:
-                obj, _ = decoder.raw_decode(text[idx:])
-            except Exception:
+                obj, _ = _JSON_DECODER.raw_decode(text, match.start())
+            except ValueError:
+                match = _JSON_START_RE.search(text, match.start() + 1)
                 continue
             return obj
         return None
 
+    # Rotas (atributo intermediario, atributo do client, metodo de envio) testadas
+    # na ordem em que aparecem nas versoes suportadas do browser-use.
+    _CDP_SEND_ROUTES = tuple(
+        (owner_attr, client_attr, send_attr)
+        for owner_attr, client_attr in (
+            (None, "cdp_client_root"),
+            (None, "_cdp_client_root"),
+            (None, "cdp_client"),
+            (None, "_cdp_client"),
+            ("cdp_session", "cdp_client"),
+            ("cdp_session", "_cdp_client"),
+        )
+        for send_attr in ("send", "send_raw")
+    )
+    _cdp_send_route: Optional[tuple] = None
+
+    def _resolve_cdp_sender(self, browser_session: BrowserSession, route: tuple):
+        owner_attr, client_attr, send_attr = route
+        owner = getattr(browser_session, owner_attr, None) if owner_attr else browser_session
+        if owner is None:
+            return None
+        client = getattr(owner, client_attr, None)
+        if not client:
+            return None
+        sender = getattr(client, send_attr, None)
+        return sender if callable(sender) else None
+
     async def _send_cdp_command(
         self,
         browser_session: BrowserSession,
         method: str,
         params: Optional[Dict[str, Any]] = None,
     ) -> Optional[Dict[str, Any]]:
+        """
+        Envia comando CDP usando a primeira rota que funcionar.
+        A rota vencedora fica em cache na classe para as proximas chamadas.
+        """
         params = params or {}
-        candidates = []
-        for attr in ("cdp_client_root", "_cdp_client_root", "cdp_client", "_cdp_client"):
-            client = getattr(browser_session, attr, None)
-            if client:
-                candidates.append(client)
-        cdp_session = getattr(browser_session, "cdp_session", None)
-        if cdp_session is not None:
-            for attr in ("cdp_client", "_cdp_client"):
-                client = getattr(cdp_session, attr, None)
-                if client:
-                    candidates.append(client)
-
-        for client in candidates:
-            send = getattr(client, "send", None)
-            if callable(send):
-                try:
-                    return await self._maybe_await(send(method, params))
-                except Exception:
-                    pass
-            send_raw = getattr(client, "send_raw", None)
-            if callable(send_raw):
-                try:
-                    payload = {"method": method, "params": params}
-                    return await self._maybe_await(send_raw(payload))
-                except Exception:
-                    pass
+        cached_route = type(self)._cdp_send_route
+        routes = self._CDP_SEND_ROUTES
+        if cached_route is not None:
+            routes = (cached_route,) + tuple(route for route in routes if route != cached_route)
+
+        for route in routes:
+            sender = self._resolve_cdp_sender(browser_session, route)
+            if sender is None:
+                continue
+            try:
+                if route[2] == "send_raw":
+                    result = await self._maybe_await(sender({"method": method, "params": params}))
+                else:
+                    result = await self._maybe_await(sender(method, params))
+            except Exception:
+                continue
+            type(self)._cdp_send_route = route
+            return result
         return None
 
     async def _prepare_browserless_reconnect(
@@ -737,10 +1309,19 @@ class BrowserUseAgent:
         """
         Verifica se existe cookie de autenticação aparentemente válido.
         """
-        now_ts = datetime.utcnow().timestamp()
-        for cookie in self._extract_cookies(storage_state):
-            if str(cookie.get("name", "")).lower() != "sessionid":
-                continue
+        # Instagram grava o cookie sempre como "sessionid"; comparacao exata
+        # evita alocar uma copia em minusculas para cada cookie do jar.
+        session_cookies = [
+            cookie
+            for cookie in self._extract_cookies(storage_state)
+            if cookie.get("name") == "sessionid"
+        ]
+        if not session_cookies:
+            return False
+
+        # Epoch real: utcnow().timestamp() trataria o horario UTC como local.
+        now_ts = time.time()
+        for cookie in session_cookies:
             expires = cookie.get("expires")
             if expires in (None, -1, "-1"):
                 return True
@@ -758,15 +1339,15 @@ class BrowserUseAgent:
         """
         Verifica se o storage_state ainda representa uma sessao autenticada.
         """
+        # Modo padrão: reutilização otimista baseada no cookie de sessão,
+        # sem requisicao HTTP ao Instagram.
+        if not settings.instagram_session_strict_validation:
+            return self._has_valid_auth_cookie(storage_state)
+
         cookies = self._extract_cookies(storage_state)
         if not cookies:
             return False
 
-        # Modo padrão: reutilização otimista baseada no cookie de sessão.
-        if not settings.instagram_session_strict_validation:
-            if self._has_valid_auth_cookie(storage_state):
-                return True
-
         jar = self._build_cookie_jar(cookies)
         headers = {
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
@@ -817,34 +1398,30 @@ class BrowserUseAgent:
         return resp.status_code == 200
 
     def _should_retry_login_error(self, exc: Exception) -> bool:
-        message = str(exc).lower()
-        retry_markers = (
-            "root cdp client not initialized",
-            "failed to establish cdp connection",
-            "connectionclosederror",
-            "protocol error",
-            "reserved bits must be 0",
-            "sent 1002",
-            "client is stopping",
-            "websocket",
-            "navigation failed",
-        )
-        return any(marker in message for marker in retry_markers)
+        return _RETRY_LOGIN_ERROR_RE.search(str(exc)) is not None
 
     async def _export_storage_state_with_retry(
         self,
         browser_session: BrowserSession,
         attempts: int = 2,
     ) -> Dict[str, Any]:
+        """
+        Exporta storage_state com timeout por tentativa e backoff exponencial curto.
+        """
+        timeout = getattr(settings, "browser_use_export_timeout_seconds", 15.0)
         last_error: Optional[BaseException] = None
         for attempt in range(1, max(1, attempts) + 1):
             try:
-                return await self._maybe_await(browser_session.export_storage_state())
+                return await asyncio.wait_for(
+                    self._maybe_await(browser_session.export_storage_state()),
+                    timeout=timeout,
+                )
             except Exception as exc:
                 last_error = exc
-                if attempt == attempts or not self._should_retry_login_error(exc):
+                is_timeout = isinstance(exc, asyncio.TimeoutError)
+                if attempt == attempts or not (is_timeout or self._should_retry_login_error(exc)):
                     raise
-                await asyncio.sleep(1)
+                await asyncio.sleep(0.2 * (2 ** (attempt - 1)))
         if last_error:
             raise last_error
         return {}
@@ -875,15 +1452,15 @@ class BrowserUseAgent:
                 logger.info("Sessao do Instagram reutilizada do banco.")
                 return existing.storage_state
 
-            reconnect_url = self._get_browserless_reconnect_url(existing.storage_state)
+            state_pieces = self._parse_storage_state(existing.storage_state)
+            reconnect_url = state_pieces.reconnect_url
             if reconnect_url:
                 refreshed = await self._refresh_session_via_reconnect(db, reconnect_url, existing)
                 if refreshed:
                     return refreshed
 
             if settings.browserless_session_enabled:
-                session_info = self._get_browserless_session_info(existing.storage_state)
-                stop_url = session_info.get("stop")
+                stop_url = state_pieces.session_info.get("stop")
                 if stop_url:
                     await self._stop_browserless_session(stop_url)
 
@@ -908,10 +1485,16 @@ class BrowserUseAgent:
             )
             return None
 
+        # Resolve o endpoint CDP uma unica vez para todas as tentativas de login
+        # (com a API de sessao do Browserless cada tentativa cria a sua propria).
+        cdp_url = None
+        if not settings.browserless_session_enabled:
+            cdp_url = await self._resolve_browserless_cdp_url()
+
         last_error = None
         for attempt in range(1, settings.browser_use_max_retries + 1):
             try:
-                return await self._login_and_save_session(db)
+                return await self._login_and_save_session(db, cdp_url=cdp_url)
             except Exception as exc:
                 last_error = exc
                 if attempt >= settings.browser_use_max_retries or not self._should_retry_login_error(exc):
@@ -930,7 +1513,11 @@ class BrowserUseAgent:
             raise last_error
         return None
 
-    async def _login_and_save_session(self, db: Session) -> Dict[str, Any]:
+    async def _login_and_save_session(
+        self,
+        db: Session,
+        cdp_url: Optional[str] = None,
+    ) -> Dict[str, Any]:
         logger.info("Iniciando login no Instagram via Browser Use...")
 
         session_info: Dict[str, Any] = {}
@@ -941,31 +1528,13 @@ class BrowserUseAgent:
             connect_url = session_info.get("connect")
             stop_url = session_info.get("stop")
 
-        cdp_url = connect_url or await self._resolve_browserless_cdp_url()
+        cdp_url = connect_url or cdp_url or await self._resolve_browserless_cdp_url()
         browser_session = self._create_browser_session(cdp_url)
-        llm = ChatOpenAI(model=self.model, api_key=self.api_key)
-
-        login_task = f"""
-        Voce esta em um navegador controlado por IA.
-        Acesse https://www.instagram.com/accounts/login/.
+        llm = self._get_llm()
 
-        Passos:
-        1) Se aparecer um modal de cookies, clique em "Allow all cookies" (ou equivalente).
-        2) Preencha o campo de usuario com: {settings.instagram_username}
-        3) Preencha o campo de senha com: {settings.instagram_password}
-        4) Clique em "Log in"/"Entrar".
-        5) Se aparecer a tela "Save your login info?", clique em "Save info".
-        6) Aguarde o feed inicial carregar e confirme que o login foi bem sucedido.
-        7) Se aparecer mensagem de login invalido (senha incorreta/usuario invalido), responda com "LOGIN_INVALID" e pare.
-        8) Se houver challenge/2FA, pare e reporte erro.
-
-        Importante:
-        - Use apenas a aba atual (nao abrir nova aba).
-        - Aguarde o DOM carregar; se ficar vazio, aguarde alguns segundos e recarregue uma vez.
-        - Nao clique em "Forgot password?"; se nao encontrar um botao claro de login, pressione Enter no campo de senha.
-
-        Ao final, confirme sucesso com um texto curto: "LOGIN_OK".
-        """
+        login_task = _LOGIN_TASK_TMPL.format_map(
+            {"username": settings.instagram_username, "password": settings.instagram_password}
+        )
 
         agent = self._create_agent(
             task=login_task,
@@ -998,10 +1567,20 @@ class BrowserUseAgent:
                     browser_session.stop = original_stop  # type: ignore[assignment]
                 except Exception:
                     pass
-            reconnect_url = None
+            # Browserless.reconnect e o export sao independentes: enviados juntos
+            # na mesma conexao CDP economizam um round-trip no login.
+            reconnect_result, export_result = await asyncio.gather(
+                self._prepare_browserless_reconnect(browser_session),
+                self._export_storage_state_with_retry(browser_session),
+                return_exceptions=True,
+            )
+            reconnect_url = reconnect_result if isinstance(reconnect_result, str) else None
+            if isinstance(reconnect_result, BaseException):
+                logger.warning("Falha ao preparar reconnect do Browserless: %s", reconnect_result)
             try:
-                reconnect_url = await self._prepare_browserless_reconnect(browser_session)
-                storage_state = await self._export_storage_state_with_retry(browser_session)
+                if isinstance(export_result, BaseException):
+                    raise export_result
+                storage_state = export_result
             except Exception as exc:
                 storage_state = None
                 if reconnect_url:
@@ -1039,9 +1618,10 @@ class BrowserUseAgent:
                 last_used_at=datetime.utcnow(),
                 is_active=True,
             )
+            # UPDATE de desativacao + INSERT vao no mesmo commit; o retorno e o
+            # storage_state, entao nao ha refresh da linha.
             db.add(session)
             db.commit()
-            db.refresh(session)
 
             login_ok = True
             logger.info("Sessao do Instagram salva no banco.")
@@ -1122,7 +1702,7 @@ class BrowserUseAgent:
 
         cdp_url = await self._resolve_browserless_cdp_url()
         browser_session = self._create_browser_session(cdp_url)
-        llm = ChatOpenAI(model=self.model, api_key=self.api_key)
+        llm = self._get_llm()
 
         login_task = f"""
         Voce esta em um navegador controlado por IA.
@@ -1194,6 +1774,149 @@ class BrowserUseAgent:
                 await self._safe_stop_session(browser_session)
 
 
+    def _select_cdp_url_for_attempt(self, ctx: _AgentRunContext, attempt: int) -> Optional[str]:
+        """
+        Na primeira tentativa reaproveita reconnect/sessao Browserless do storage_state;
+        retorna None quando o CDP padrao deve ser usado.
+        """
+        if attempt != 1:
+            return None
+        if ctx.reconnect_url:
+            logger.info("Tentando reaproveitar navegador autenticado via reconnect.")
+            return self._ensure_ws_token(ctx.reconnect_url)
+        if ctx.session_connect_url:
+            logger.info("Tentando reaproveitar sessao Browserless existente.")
+            return self._ensure_ws_token(ctx.session_connect_url)
+        return None
+
+    async def _retry_agent_attempts(
+        self,
+        run_once: Callable[[int], Awaitable[Dict[str, Any]]],
+        max_retries: int,
+        retry_delay: float,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Executa ``run_once(attempt)`` ate ``max_retries`` vezes. _RetryableAgentError
+        aciona backoff exponencial com jitter; qualquer retorno encerra o loop.
+        Retorna None quando todas as tentativas falharam.
+        """
+        for attempt in range(1, max_retries + 1):
+            try:
+                return await run_once(attempt)
+            except _RetryableAgentError as exc:
+                if exc.invalidate_cdp:
+                    self._invalidate_cdp_cache()
+                if attempt >= max_retries:
+                    break
+                wait_time = self._retry_wait_time(retry_delay, attempt)
+                logger.warning(
+                    "%s (tentativa %s/%s). Retentando em %ss...",
+                    exc,
+                    attempt,
+                    max_retries,
+                    wait_time,
+                )
+                await asyncio.sleep(wait_time)
+        return None
+
+    async def _scrape_profile_posts_once(
+        self,
+        ctx: _AgentRunContext,
+        profile_url: str,
+        cache_key: tuple,
+        attempt: int,
+    ) -> Dict[str, Any]:
+        max_retries = ctx.max_retries
+        can_retry = attempt < max_retries
+        browser_session = None
+        restore_event_bus = None
+        pool_key: tuple = ()
+        reusable = False
+
+        try:
+            logger.info(
+                "🤖 Browser Use: Raspando posts de %s (tentativa %s/%s)",
+                profile_url,
+                attempt,
+                max_retries,
+            )
+
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY is required for Browser Use.")
+
+            cdp_url = self._select_cdp_url_for_attempt(ctx, attempt)
+            if cdp_url is None:
+                cdp_url = await self._get_cached_cdp_url()
+                logger.info("Usando CDP padrao com storage_state.")
+
+            # Sessoes do pool so na primeira tentativa; retentativas reconectam do zero.
+            pool_key = (cdp_url, ctx.storage_fingerprint)
+            browser_session = await self._acquire_browser_session(
+                pool_key,
+                ctx.storage_state_for_session,
+                reuse=attempt == 1,
+            )
+            agent = self._create_agent(
+                task=ctx.task,
+                llm=self._get_llm(),
+                browser_session=browser_session,
+            )
+
+            restore_event_bus = self._patch_event_bus_for_stop(browser_session)
+            history = await self._run_agent(agent)
+
+            if not history.is_done():
+                logger.warning("⚠️ Browser Use não completou a tarefa")
+
+            final_result = history.final_result() or ""
+
+            if (not history.is_successful()) and self._contains_protocol_error(final_result) and can_retry:
+                raise _RetryableAgentError("Sessao CDP instavel detectada")
+
+            data = self._extract_json_object_with_key(final_result, "posts")
+            if data is not None:
+                if data.get("error") == "login_required" and can_retry:
+                    raise _RetryableAgentError("Agente retornou login_required", invalidate_cdp=False)
+                logger.info("✅ Browser Use extraiu %s posts", len(data.get("posts", [])))
+                # Resultados com erro (ex.: login_required na ultima tentativa) nao vao para o
+                # cache nem devolvem ao pool uma sessao possivelmente deslogada.
+                if not data.get("error"):
+                    reusable = True
+                    self._store_cached_scrape(cache_key, data)
+                return data  # Sucesso!
+
+            # Fallback: retornar resultado bruto
+            logger.warning("⚠️ Não foi possível extrair JSON estruturado")
+            if self._contains_protocol_error(final_result) and can_retry:
+                raise _RetryableAgentError("Falha de protocolo detectada no resultado final")
+            failure_error = self._classify_agent_failure_error(
+                final_result=final_result,
+                history=history,
+            )
+            return {
+                "posts": [],
+                "total_found": 0,
+                "raw_result": final_result,
+                "error": failure_error,
+            }
+
+        except _RetryableAgentError:
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            is_retryable = isinstance(e, asyncio.TimeoutError) or _RETRYABLE_ERROR_RE.search(error_msg) is not None
+            if is_retryable and can_retry:
+                raise _RetryableAgentError(f"⚠️ Falha transitoria: {error_msg[:100]}") from e
+            logger.error("❌ Erro no Browser Use Agent (tentativa %s/%s): %s", attempt, max_retries, e)
+            return {"posts": [], "total_found": 0, "error": error_msg}
+
+        finally:
+            # Sempre limpar recursos
+            if callable(restore_event_bus):
+                restore_event_bus()
+            if browser_session:
+                await self._release_browser_session(pool_key, browser_session, reusable)
+
     async def scrape_profile_posts(
         self,
         profile_url: str,
@@ -1213,190 +1936,188 @@ class BrowserUseAgent:
         """
         max_retries = getattr(settings, 'browser_use_max_retries', 3)
         retry_delay = 5  # segundos
-        reconnect_url = self._get_browserless_reconnect_url(storage_state)
-        session_info = self._get_browserless_session_info(storage_state)
-        session_connect_url = session_info.get("connect") if isinstance(session_info.get("connect"), str) else None
-        clean_storage_state = self._sanitize_storage_state(storage_state)
-        storage_state_file = self._write_storage_state_temp_file(storage_state)
-        storage_state_for_session: Optional[Union[Dict[str, Any], str]]
-        storage_state_for_session = storage_state_file or clean_storage_state
+        prepared_state = self._prepare_storage_state(storage_state)
+        cache_key = ("posts", profile_url, max_posts, prepared_state.fingerprint)
+        cached = self._get_cached_scrape(cache_key)
+        if cached is not None:
+            logger.info("Posts de %s servidos do cache do agente.", profile_url)
+            return cached
+        storage_state_file = self._ensure_storage_state_file(prepared_state)
         logger.info(
             "Browser Use recebeu storage_state com %s cookies.",
-            len(self._extract_cookies(storage_state or {})),
+            len(prepared_state.pieces.cookies),
         )
         if storage_state_file:
             logger.info("Storage state persistido em arquivo temporario para compatibilidade com browser-use 0.11.x.")
 
+        ctx = self._build_agent_run_context(
+            _PROFILE_POSTS_TASK_TMPL.format_map({"profile_url": profile_url, "max_posts": max_posts}),
+            prepared_state,
+            storage_state_file,
+            max_retries,
+        )
+        result = await self._retry_agent_attempts(
+            lambda attempt: self._scrape_profile_posts_once(ctx, profile_url, cache_key, attempt),
+            max_retries,
+            retry_delay,
+        )
+        if result is None:
+            # Todas as tentativas falharam
+            return {"posts": [], "total_found": 0, "error": "all_retries_failed"}
+        return result
+
+    async def scrape_profiles_batch(
+        self,
+        profile_urls: List[str],
+        storage_state: Optional[Dict[str, Any]],
+        max_posts: int = 5,
+        concurrency: int = 4,
+    ) -> List[Dict[str, Any]]:
+        """
+        Raspa posts de varios perfis em paralelo, limitado por um semaforo.
+
+        Args:
+            profile_urls: URLs dos perfis Instagram
+            storage_state: Estado de sessão autenticada (cookies)
+            max_posts: Número máximo de posts por perfil
+            concurrency: Número máximo de agentes simultâneos
+
+        Returns:
+            Lista de resultados de scrape_profile_posts, na mesma ordem de profile_urls
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _scrape(profile_url: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.scrape_profile_posts(
+                    profile_url=profile_url,
+                    storage_state=storage_state,
+                    max_posts=max_posts,
+                )
+
+        return list(await asyncio.gather(*(_scrape(url) for url in profile_urls)))
+
+    async def _scrape_post_like_users_once(
+        self,
+        ctx: _AgentRunContext,
+        post_url: str,
+        max_users: int,
+        cache_key: tuple,
+        attempt: int,
+    ) -> Dict[str, Any]:
+        max_retries = ctx.max_retries
+        can_retry = attempt < max_retries
+        browser_session = None
+        restore_event_bus = None
+        pool_key: tuple = ()
+        reusable = False
         try:
-            for attempt in range(1, max_retries + 1):
-                browser_session = None
-                restore_event_bus = None
+            logger.info(
+                "🤖 Browser Use: Coletando curtidores de %s (tentativa %s/%s)",
+                post_url,
+                attempt,
+                max_retries,
+            )
 
-                try:
-                    logger.info(f"🤖 Browser Use: Raspando posts de {profile_url} (tentativa {attempt}/{max_retries})")
-
-                    if not self.api_key:
-                        raise ValueError("OPENAI_API_KEY is required for Browser Use.")
-
-                    use_reconnect = bool(reconnect_url and attempt == 1)
-                    use_session_connect = bool((not reconnect_url) and session_connect_url and attempt == 1)
-                    if use_reconnect:
-                        cdp_url = self._ensure_ws_token(reconnect_url)
-                        logger.info("Tentando reaproveitar navegador autenticado via reconnect.")
-                    elif use_session_connect:
-                        cdp_url = self._ensure_ws_token(session_connect_url)
-                        logger.info("Tentando reaproveitar sessao Browserless existente.")
-                    else:
-                        cdp_url = await self._resolve_browserless_cdp_url()
-                        logger.info("Usando CDP padrao com storage_state.")
-
-                    task = f"""
-                    Você é um raspador de dados do Instagram. Extraia os primeiros {max_posts} posts do perfil.
-
-                    PERFIL:
-                    - URL: {profile_url}
-
-                    ESTRATÉGIA (obrigatória):
-                    1) Abra o perfil e aguarde carregar.
-                    2) Faça scroll suave 2-3 vezes para carregar o grid.
-                    3) Colete os primeiros {max_posts} links CANÔNICOS de posts a partir de anchors com href contendo "/p/" ou "/reel/".
-                       - Não clique em ícones SVG, overlays de "Clip" ou elementos decorativos.
-                       - Se precisar clicar, clique no link/anchor do post (href /p/... ou /reel/...), não no ícone.
-                    4) Para cada URL coletada:
-                       a) Navegue para a URL do post na MESMA aba (new_tab: false).
-                       b) Aguarde carregar.
-                       c) Extraia:
-                          - caption completa (ou null)
-                          - like_count (inteiro ou null)
-                          - comment_count (inteiro ou null)
-                          - posted_at (texto visível ou null)
-                    5) Retorne JSON final com todos os posts coletados.
-
-                    FORMATO DE SAÍDA (JSON puro, sem texto extra):
-                    {{
-                      "posts": [
-                        {{
-                          "post_url": "https://instagram.com/p/CODIGO/ ou https://instagram.com/reel/CODIGO/",
-                          "caption": "texto da caption",
-                          "like_count": 123,
-                          "comment_count": 45,
-                          "posted_at": "2 dias atrás" ou null
-                        }}
-                      ],
-                      "total_found": {max_posts}
-                    }}
-
-                    REGRAS:
-                    - Se o perfil for privado: {{"posts": [], "total_found": 0, "error": "private_profile"}}
-                    - Use apenas a aba atual; não abra nova aba/janela.
-                    - Se não conseguir um campo, retorne null naquele campo.
-                    - Se não conseguir abrir um post, pule para o próximo.
-                    - Não invente dados.
-                    """
-
-                    browser_session = self._create_browser_session(cdp_url, storage_state=storage_state_for_session)
-                    llm = ChatOpenAI(model=self.model, api_key=self.api_key)
-                    agent = self._create_agent(
-                        task=task,
-                        llm=llm,
-                        browser_session=browser_session,
-                    )
-
-                    restore_event_bus = self._patch_event_bus_for_stop(browser_session)
-                    history = await agent.run()
-
-                    if not history.is_done():
-                        logger.warning("⚠️ Browser Use não completou a tarefa")
-                        # Não fazer return aqui, deixar o except capturar
-
-                    final_result = history.final_result() or ""
-
-                    if (not history.is_successful()) and self._contains_protocol_error(final_result) and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Sessao CDP instavel detectada (tentativa %s/%s). Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    data = self._extract_json_object_with_key(final_result, "posts")
-                    if data is not None:
-                        if data.get("error") == "login_required" and attempt < max_retries:
-                            wait_time = retry_delay * attempt
-                            logger.warning(
-                                "Agente retornou login_required (tentativa %s/%s). Retentando em %ss...",
-                                attempt,
-                                max_retries,
-                                wait_time,
-                            )
-                            await asyncio.sleep(wait_time)
-                            continue
-                        logger.info(f"✅ Browser Use extraiu {len(data.get('posts', []))} posts")
-                        return data  # Sucesso!
-
-                    # Fallback: retornar resultado bruto
-                    logger.warning("⚠️ Não foi possível extrair JSON estruturado")
-                    if self._contains_protocol_error(final_result) and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Falha de protocolo detectada no resultado final (%s/%s). Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-                    failure_error = self._classify_agent_failure_error(
-                        final_result=final_result,
-                        history=history,
-                    )
-                    return {
-                        "posts": [],
-                        "total_found": 0,
-                        "raw_result": final_result,
-                        "error": failure_error,
-                    }
-
-                except Exception as e:
-                    error_msg = str(e)
-                    is_retryable = any(marker in error_msg.lower() for marker in [
-                        "http 500",
-                        "connection",
-                        "timeout",
-                        "websocket",
-                        "failed to establish",
-                        "protocol error",
-                        "reserved bits",
-                        "client is stopping",
-                    ])
-
-                    if is_retryable and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            f"⚠️ Tentativa {attempt}/{max_retries} falhou: {error_msg[:100]}. "
-                            f"Aguardando {wait_time}s antes de tentar novamente..."
-                        )
-                        await asyncio.sleep(wait_time)
-                        # Continue para próxima iteração
-                    else:
-                        # Não é retryável ou última tentativa
-                        logger.error(f"❌ Erro no Browser Use Agent (tentativa {attempt}/{max_retries}): {e}")
-                        return {"posts": [], "total_found": 0, "error": str(e)}
-
-                finally:
-                    # Sempre limpar recursos
-                    if callable(restore_event_bus):
-                        restore_event_bus()
-                    if browser_session:
-                        await self._detach_browser_session(browser_session)
-
-            # Se saiu do loop sem retornar, todas as tentativas falharam
-            return {"posts": [], "total_found": 0, "error": "all_retries_failed"}
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY is required for Browser Use.")
+
+            cdp_url = self._select_cdp_url_for_attempt(ctx, attempt)
+            if cdp_url is None:
+                cdp_url = await self._get_cached_cdp_url()
+
+            # Sessoes do pool so na primeira tentativa; retentativas reconectam do zero.
+            pool_key = (cdp_url, ctx.storage_fingerprint)
+            browser_session = await self._acquire_browser_session(
+                pool_key,
+                ctx.storage_state_for_session,
+                reuse=attempt == 1,
+            )
+            agent = self._create_agent(
+                task=ctx.task,
+                llm=self._get_llm(),
+                browser_session=browser_session,
+            )
+
+            restore_event_bus = self._patch_event_bus_for_stop(browser_session)
+            history = await self._run_agent(agent)
+            final_result = history.final_result() or ""
+
+            if (not history.is_successful()) and self._contains_protocol_error(final_result) and can_retry:
+                raise _RetryableAgentError("Sessao CDP instavel ao coletar curtidores")
+
+            data = self._extract_json_object_with_key(final_result, "likes_accessible")
+            if data is None:
+                logger.warning("Falha ao extrair JSON de curtidores: %s", final_result[:180])
+                if self._contains_protocol_error(final_result) and can_retry:
+                    raise _RetryableAgentError("Falha de protocolo detectada na coleta de curtidores")
+                failure_error = self._classify_agent_failure_error(
+                    final_result=final_result,
+                    history=history,
+                )
+                return {
+                    "post_url": post_url,
+                    "likes_accessible": False,
+                    "like_users": [],
+                    "error": failure_error,
+                    "raw_result": final_result or self._history_errors_text(history),
+                }
+
+            if data.get("error") == "login_required" and can_retry:
+                raise _RetryableAgentError(
+                    "Agente retornou login_required ao coletar curtidores",
+                    invalidate_cdp=False,
+                )
+
+            raw_users = (
+                value.strip()
+                for value in data.get("like_users", []) or []
+                if isinstance(value, str) and "instagram.com" in value
+            )
+            unique_users = list(dict.fromkeys(user for user in raw_users if user))[:max_users]
+
+            result = {
+                "post_url": data.get("post_url") or post_url,
+                "likes_accessible": bool(data.get("likes_accessible")),
+                "like_users": unique_users,
+                "total_collected": len(unique_users),
+                "error": data.get("error"),
+            }
+            if not result["error"]:
+                reusable = True
+                self._store_cached_scrape(cache_key, result)
+            return result
+
+        except _RetryableAgentError:
+            raise
+        except Exception as exc:
+            failure_error = self._classify_agent_failure_error(exc=exc)
+            if failure_error == "rate_limit_exceeded":
+                return {
+                    "post_url": post_url,
+                    "likes_accessible": False,
+                    "like_users": [],
+                    "error": failure_error,
+                }
+            is_retryable = (
+                isinstance(exc, asyncio.TimeoutError)
+                or _RETRYABLE_ERROR_RE.search(str(exc)) is not None
+            )
+            if is_retryable and can_retry:
+                raise _RetryableAgentError(
+                    f"⚠️ Falha transitoria ao coletar curtidores: {str(exc)[:120]}"
+                ) from exc
+            return {
+                "post_url": post_url,
+                "likes_accessible": False,
+                "like_users": [],
+                "error": str(exc),
+            }
         finally:
-            self._cleanup_storage_state_temp_file(storage_state_file)
+            if callable(restore_event_bus):
+                restore_event_bus()
+            if browser_session:
+                await self._release_browser_session(pool_key, browser_session, reusable)
 
     async def scrape_post_like_users(
         self,
@@ -1417,204 +2138,209 @@ class BrowserUseAgent:
         """
         max_retries = getattr(settings, "browser_use_max_retries", 3)
         retry_delay = 5
-        reconnect_url = self._get_browserless_reconnect_url(storage_state)
-        session_info = self._get_browserless_session_info(storage_state)
-        session_connect_url = session_info.get("connect") if isinstance(session_info.get("connect"), str) else None
-        clean_storage_state = self._sanitize_storage_state(storage_state)
-        storage_state_file = self._write_storage_state_temp_file(storage_state)
-        storage_state_for_session: Optional[Union[Dict[str, Any], str]]
-        storage_state_for_session = storage_state_file or clean_storage_state
-
-        try:
-            for attempt in range(1, max_retries + 1):
-                browser_session = None
-                restore_event_bus = None
-                try:
-                    logger.info(
-                        "🤖 Browser Use: Coletando curtidores de %s (tentativa %s/%s)",
-                        post_url,
-                        attempt,
-                        max_retries,
-                    )
-
-                    if not self.api_key:
-                        raise ValueError("OPENAI_API_KEY is required for Browser Use.")
-
-                    use_reconnect = bool(reconnect_url and attempt == 1)
-                    use_session_connect = bool((not reconnect_url) and session_connect_url and attempt == 1)
-                    if use_reconnect:
-                        cdp_url = self._ensure_ws_token(reconnect_url)
-                    elif use_session_connect:
-                        cdp_url = self._ensure_ws_token(session_connect_url)
-                    else:
-                        cdp_url = await self._resolve_browserless_cdp_url()
-
-                    task = f"""
-                    Você está em um navegador autenticado no Instagram.
-                    Sua tarefa é extrair os links dos perfis que curtiram um post.
-
-                    PASSOS:
-                    1) Acesse o post: {post_url}
-                    2) Aguarde a página carregar.
-                    3) Se houver modal de cookies, aceite.
-                    4) Localize e clique no link/botão de curtidas para abrir a lista de usuários.
-                    5) Se a lista abrir, role o modal/lista até coletar até {max_users} links únicos de perfis.
-                    6) Retorne os links no formato https://www.instagram.com/usuario/
-
-                    FORMATO DE SAÍDA (JSON):
-                    {{
-                      "post_url": "{post_url}",
-                      "likes_accessible": true,
-                      "like_users": ["https://www.instagram.com/usuario1/"],
-                      "total_collected": 1
-                    }}
-
-                    REGRAS:
-                    - Se não for possível abrir a lista de curtidas, retorne:
-                      {{
-                        "post_url": "{post_url}",
-                        "likes_accessible": false,
-                        "like_users": [],
-                        "error": "likes_unavailable"
-                      }}
-                    - Não abra nova aba.
-                    - Não invente links.
-                    """
-
-                    browser_session = self._create_browser_session(cdp_url, storage_state=storage_state_for_session)
-                    llm = ChatOpenAI(model=self.model, api_key=self.api_key)
-                    agent = self._create_agent(
-                        task=task,
-                        llm=llm,
-                        browser_session=browser_session,
-                    )
-
-                    restore_event_bus = self._patch_event_bus_for_stop(browser_session)
-                    history = await agent.run()
-                    final_result = history.final_result() or ""
-
-                    if (not history.is_successful()) and self._contains_protocol_error(final_result) and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Sessao CDP instavel ao coletar curtidores (%s/%s). Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    data = self._extract_json_object_with_key(final_result, "likes_accessible")
-                    if data is None:
-                        logger.warning("Falha ao extrair JSON de curtidores: %s", final_result[:180])
-                        if self._contains_protocol_error(final_result) and attempt < max_retries:
-                            wait_time = retry_delay * attempt
-                            logger.warning(
-                                "Falha de protocolo detectada na coleta de curtidores (%s/%s). Retentando em %ss...",
-                                attempt,
-                                max_retries,
-                                wait_time,
-                            )
-                            await asyncio.sleep(wait_time)
-                            continue
-                        failure_error = self._classify_agent_failure_error(
-                            final_result=final_result,
-                            history=history,
-                        )
-                        return {
-                            "post_url": post_url,
-                            "likes_accessible": False,
-                            "like_users": [],
-                            "error": failure_error,
-                            "raw_result": final_result or self._history_errors_text(history),
-                        }
-
-
-                    if data.get("error") == "login_required" and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Agente retornou login_required ao coletar curtidores (%s/%s). Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    unique_users: list[str] = []
-                    for value in data.get("like_users", []) or []:
-                        if not isinstance(value, str):
-                            continue
-                        if "instagram.com" not in value:
-                            continue
-                        normalized = value.strip()
-                        if normalized and normalized not in unique_users:
-                            unique_users.append(normalized)
-                        if len(unique_users) >= max_users:
-                            break
-
-                    return {
-                        "post_url": data.get("post_url") or post_url,
-                        "likes_accessible": bool(data.get("likes_accessible")),
-                        "like_users": unique_users,
-                        "total_collected": len(unique_users),
-                        "error": data.get("error"),
-                    }
-
-                except Exception as exc:
-                    failure_error = self._classify_agent_failure_error(exc=exc)
-                    if failure_error == "rate_limit_exceeded":
-                        return {
-                            "post_url": post_url,
-                            "likes_accessible": False,
-                            "like_users": [],
-                            "error": failure_error,
-                        }
-                    error_msg = str(exc).lower()
-                    is_retryable = any(
-                        marker in error_msg
-                        for marker in (
-                            "http 500",
-                            "connection",
-                            "timeout",
-                            "websocket",
-                            "failed to establish",
-                            "protocol error",
-                            "reserved bits",
-                            "client is stopping",
-                        )
-                    )
-                    if is_retryable and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "⚠️ Tentativa %s/%s falhou ao coletar curtidores: %s. Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            str(exc)[:120],
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-                    return {
-                        "post_url": post_url,
-                        "likes_accessible": False,
-                        "like_users": [],
-                        "error": str(exc),
-                    }
-                finally:
-                    if callable(restore_event_bus):
-                        restore_event_bus()
-                    if browser_session:
-                        await self._detach_browser_session(browser_session)
-
+        prepared_state = self._prepare_storage_state(storage_state)
+        cache_key = ("likes", post_url, max_users, prepared_state.fingerprint)
+        cached = self._get_cached_scrape(cache_key)
+        if cached is not None:
+            logger.info("Curtidores de %s servidos do cache do agente.", post_url)
+            return cached
+        storage_state_file = self._ensure_storage_state_file(prepared_state)
+
+        ctx = self._build_agent_run_context(
+            _LIKE_USERS_TASK_TMPL.format_map({"post_url": post_url, "max_users": max_users}),
+            prepared_state,
+            storage_state_file,
+            max_retries,
+        )
+        result = await self._retry_agent_attempts(
+            lambda attempt: self._scrape_post_like_users_once(ctx, post_url, max_users, cache_key, attempt),
+            max_retries,
+            retry_delay,
+        )
+        if result is None:
             return {
                 "post_url": post_url,
                 "likes_accessible": False,
                 "like_users": [],
                 "error": "all_retries_failed",
             }
+        return result
+
+    def _normalize_agent_comments(self, raw_comments: Any, max_comments: int) -> List[Dict[str, Any]]:
+        """Normaliza e deduplica os comentarios retornados pelo agente."""
+        normalized_comments: List[Dict[str, Any]] = []
+        seen_comment_keys: set[str] = set()
+
+        for value in raw_comments or []:
+            if not isinstance(value, dict):
+                continue
+
+            user_url = str(value.get("user_url") or "").strip()
+            user_username = str(value.get("user_username") or "").strip().lstrip("@")
+            if user_url.startswith("/"):
+                user_url = f"https://www.instagram.com{user_url}"
+            if not user_url and user_username:
+                user_url = f"https://www.instagram.com/{user_username}/"
+
+            if user_url and "instagram.com" in user_url:
+                parsed_user = urlparse(user_url)
+                path_parts = [part for part in parsed_user.path.split("/") if part]
+                if path_parts:
+                    normalized_username = path_parts[0].strip().lstrip("@")
+                    if normalized_username:
+                        user_username = user_username or normalized_username
+                        user_url = f"https://www.instagram.com/{normalized_username}/"
+
+            if not user_url and not user_username:
+                continue
+
+            comment_text = value.get("comment_text")
+            if comment_text is not None:
+                comment_text = str(comment_text).strip() or None
+
+            comment_posted_at = value.get("comment_posted_at")
+            if comment_posted_at is not None:
+                comment_posted_at = str(comment_posted_at).strip() or None
+
+            try:
+                comment_likes = int(value.get("comment_likes", 0) or 0)
+            except (TypeError, ValueError):
+                comment_likes = 0
+
+            try:
+                comment_replies = int(value.get("comment_replies", 0) or 0)
+            except (TypeError, ValueError):
+                comment_replies = 0
+
+            dedup_key = f"{user_url or user_username}|{comment_text}|{comment_posted_at}"
+            if dedup_key in seen_comment_keys:
+                continue
+            seen_comment_keys.add(dedup_key)
+
+            normalized_comments.append(
+                {
+                    "user_url": user_url or None,
+                    "user_username": user_username or None,
+                    "comment_text": comment_text,
+                    "comment_likes": comment_likes,
+                    "comment_replies": comment_replies,
+                    "comment_posted_at": comment_posted_at,
+                }
+            )
+            if len(normalized_comments) >= max_comments:
+                break
+
+        return normalized_comments
+
+    async def _scrape_post_comments_once(
+        self,
+        ctx: _AgentRunContext,
+        post_url: str,
+        max_comments: int,
+        attempt: int,
+    ) -> Dict[str, Any]:
+        max_retries = ctx.max_retries
+        can_retry = attempt < max_retries
+        browser_session = None
+        restore_event_bus = None
+        try:
+            logger.info(
+                "Browser Use: Coletando comentarios de %s (tentativa %s/%s)",
+                post_url,
+                attempt,
+                max_retries,
+            )
+
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY is required for Browser Use.")
+
+            cdp_url = self._select_cdp_url_for_attempt(ctx, attempt)
+            if cdp_url is None:
+                cdp_url = await self._get_cached_cdp_url()
+
+            browser_session = self._create_browser_session(cdp_url, storage_state=ctx.storage_state_for_session)
+            agent = self._create_agent(
+                task=ctx.task,
+                llm=self._get_llm(),
+                browser_session=browser_session,
+            )
+
+            restore_event_bus = self._patch_event_bus_for_stop(browser_session)
+            history = await self._run_agent(agent)
+            final_result = history.final_result() or ""
+
+            if (not history.is_successful()) and self._contains_protocol_error(final_result) and can_retry:
+                raise _RetryableAgentError("Sessao CDP instavel ao coletar comentarios")
+
+            data = self._extract_json_object_with_key(final_result, "comments_accessible")
+            if data is None:
+                logger.warning("Falha ao extrair JSON de comentarios: %s", final_result[:180])
+                if self._contains_protocol_error(final_result) and can_retry:
+                    raise _RetryableAgentError("Falha de protocolo detectada na coleta de comentarios")
+                failure_error = self._classify_agent_failure_error(
+                    final_result=final_result,
+                    history=history,
+                )
+                return {
+                    "post_url": post_url,
+                    "comments_accessible": False,
+                    "comments": [],
+                    "total_collected": 0,
+                    "error": failure_error,
+                    "raw_result": final_result or self._history_errors_text(history),
+                }
+
+            if data.get("error") == "login_required" and can_retry:
+                raise _RetryableAgentError(
+                    "Agente retornou login_required ao coletar comentarios",
+                    invalidate_cdp=False,
+                )
+
+            normalized_comments = self._normalize_agent_comments(data.get("comments"), max_comments)
+            comments_accessible = bool(data.get("comments_accessible"))
+            if normalized_comments and not comments_accessible:
+                comments_accessible = True
+
+            return {
+                "post_url": data.get("post_url") or post_url,
+                "comments_accessible": comments_accessible,
+                "comments": normalized_comments,
+                "total_collected": len(normalized_comments),
+                "error": data.get("error"),
+            }
+
+        except _RetryableAgentError:
+            raise
+        except Exception as exc:
+            failure_error = self._classify_agent_failure_error(exc=exc)
+            if failure_error == "rate_limit_exceeded":
+                return {
+                    "post_url": post_url,
+                    "comments_accessible": False,
+                    "comments": [],
+                    "total_collected": 0,
+                    "error": failure_error,
+                }
+            is_retryable = (
+                isinstance(exc, asyncio.TimeoutError)
+                or _RETRYABLE_ERROR_RE.search(str(exc)) is not None
+            )
+            if is_retryable and can_retry:
+                raise _RetryableAgentError(
+                    f"Falha transitoria ao coletar comentarios: {str(exc)[:120]}"
+                ) from exc
+            return {
+                "post_url": post_url,
+                "comments_accessible": False,
+                "comments": [],
+                "total_collected": 0,
+                "error": str(exc),
+            }
         finally:
-            self._cleanup_storage_state_temp_file(storage_state_file)
+            if callable(restore_event_bus):
+                restore_event_bus()
+            if browser_session:
+                await self._detach_browser_session(browser_session)
 
     async def scrape_post_comments(
         self,
@@ -1648,263 +2374,27 @@ class BrowserUseAgent:
         retry_delay = 5
         safe_max_comments = max(1, int(max_comments))
         safe_max_scrolls = max(1, int(max_scrolls))
-        reconnect_url = self._get_browserless_reconnect_url(storage_state)
-        session_info = self._get_browserless_session_info(storage_state)
-        session_connect_url = session_info.get("connect") if isinstance(session_info.get("connect"), str) else None
-        clean_storage_state = self._sanitize_storage_state(storage_state)
-        storage_state_file = self._write_storage_state_temp_file(storage_state)
-        storage_state_for_session: Optional[Union[Dict[str, Any], str]]
-        storage_state_for_session = storage_state_file or clean_storage_state
-
-        try:
-            for attempt in range(1, max_retries + 1):
-                browser_session = None
-                restore_event_bus = None
-                try:
-                    logger.info(
-                        "Browser Use: Coletando comentarios de %s (tentativa %s/%s)",
-                        post_url,
-                        attempt,
-                        max_retries,
-                    )
-
-                    if not self.api_key:
-                        raise ValueError("OPENAI_API_KEY is required for Browser Use.")
-
-                    use_reconnect = bool(reconnect_url and attempt == 1)
-                    use_session_connect = bool((not reconnect_url) and session_connect_url and attempt == 1)
-                    if use_reconnect:
-                        cdp_url = self._ensure_ws_token(reconnect_url)
-                    elif use_session_connect:
-                        cdp_url = self._ensure_ws_token(session_connect_url)
-                    else:
-                        cdp_url = await self._resolve_browserless_cdp_url()
-
-                    task = f"""
-                    Voce esta em um navegador autenticado no Instagram.
-                    Sua tarefa e extrair comentarios de um post.
-
-                    PASSOS:
-                    1) Acesse o post: {post_url}
-                    2) Aguarde a pagina carregar.
-                    3) Se houver modal de cookies, aceite.
-                    4) Abra a secao de comentarios (incluindo "view all comments", "view more comments", "ver comentarios").
-                    5) Role/carregue mais comentarios por no maximo {safe_max_scrolls} iteracoes.
-                    6) Colete ate {safe_max_comments} comentarios visiveis.
-
-                    FORMATO DE SAIDA (JSON):
-                    {{
-                      "post_url": "{post_url}",
-                      "comments_accessible": true,
-                      "comments": [
-                        {{
-                          "user_url": "https://www.instagram.com/usuario/",
-                          "user_username": "usuario",
-                          "comment_text": "texto do comentario",
-                          "comment_likes": 0,
-                          "comment_replies": 0,
-                          "comment_posted_at": "2 h"
-                        }}
-                      ],
-                      "total_collected": 1
-                    }}
-
-                    REGRAS:
-                    - Se nao for possivel abrir/carregar comentarios, retorne:
-                      {{
-                        "post_url": "{post_url}",
-                        "comments_accessible": false,
-                        "comments": [],
-                        "error": "comments_unavailable"
-                      }}
-                    - Nao abra nova aba.
-                    - Nao invente dados.
-                    - Se um campo nao estiver visivel, use null.
-                    - Retorne JSON puro no resultado final.
-                    """
-
-                    browser_session = self._create_browser_session(cdp_url, storage_state=storage_state_for_session)
-                    llm = ChatOpenAI(model=self.model, api_key=self.api_key)
-                    agent = self._create_agent(
-                        task=task,
-                        llm=llm,
-                        browser_session=browser_session,
-                    )
-
-                    restore_event_bus = self._patch_event_bus_for_stop(browser_session)
-                    history = await agent.run()
-                    final_result = history.final_result() or ""
-
-                    if (not history.is_successful()) and self._contains_protocol_error(final_result) and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Sessao CDP instavel ao coletar comentarios (%s/%s). Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    data = self._extract_json_object_with_key(final_result, "comments_accessible")
-                    if data is None:
-                        logger.warning("Falha ao extrair JSON de comentarios: %s", final_result[:180])
-                        if self._contains_protocol_error(final_result) and attempt < max_retries:
-                            wait_time = retry_delay * attempt
-                            logger.warning(
-                                "Falha de protocolo detectada na coleta de comentarios (%s/%s). Retentando em %ss...",
-                                attempt,
-                                max_retries,
-                                wait_time,
-                            )
-                            await asyncio.sleep(wait_time)
-                            continue
-                        failure_error = self._classify_agent_failure_error(
-                            final_result=final_result,
-                            history=history,
-                        )
-                        return {
-                            "post_url": post_url,
-                            "comments_accessible": False,
-                            "comments": [],
-                            "total_collected": 0,
-                            "error": failure_error,
-                            "raw_result": final_result or self._history_errors_text(history),
-                        }
-
-                    if data.get("error") == "login_required" and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Agente retornou login_required ao coletar comentarios (%s/%s). Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    normalized_comments: List[Dict[str, Any]] = []
-                    seen_comment_keys: set[str] = set()
-
-                    for value in data.get("comments", []) or []:
-                        if not isinstance(value, dict):
-                            continue
-
-                        user_url = str(value.get("user_url") or "").strip()
-                        user_username = str(value.get("user_username") or "").strip().lstrip("@")
-                        if user_url.startswith("/"):
-                            user_url = f"https://www.instagram.com{user_url}"
-                        if not user_url and user_username:
-                            user_url = f"https://www.instagram.com/{user_username}/"
-
-                        if user_url and "instagram.com" in user_url:
-                            parsed_user = urlparse(user_url)
-                            path_parts = [part for part in parsed_user.path.split("/") if part]
-                            if path_parts:
-                                normalized_username = path_parts[0].strip().lstrip("@")
-                                if normalized_username:
-                                    user_username = user_username or normalized_username
-                                    user_url = f"https://www.instagram.com/{normalized_username}/"
-
-                        if not user_url and not user_username:
-                            continue
-
-                        comment_text = value.get("comment_text")
-                        if comment_text is not None:
-                            comment_text = str(comment_text).strip() or None
-
-                        comment_posted_at = value.get("comment_posted_at")
-                        if comment_posted_at is not None:
-                            comment_posted_at = str(comment_posted_at).strip() or None
-
-                        try:
-                            comment_likes = int(value.get("comment_likes", 0) or 0)
-                        except (TypeError, ValueError):
-                            comment_likes = 0
-
-                        try:
-                            comment_replies = int(value.get("comment_replies", 0) or 0)
-                        except (TypeError, ValueError):
-                            comment_replies = 0
-
-                        dedup_key = f"{user_url or user_username}|{comment_text}|{comment_posted_at}"
-                        if dedup_key in seen_comment_keys:
-                            continue
-                        seen_comment_keys.add(dedup_key)
-
-                        normalized_comments.append(
-                            {
-                                "user_url": user_url or None,
-                                "user_username": user_username or None,
-                                "comment_text": comment_text,
-                                "comment_likes": comment_likes,
-                                "comment_replies": comment_replies,
-                                "comment_posted_at": comment_posted_at,
-                            }
-                        )
-                        if len(normalized_comments) >= safe_max_comments:
-                            break
-
-                    comments_accessible = bool(data.get("comments_accessible"))
-                    if normalized_comments and not comments_accessible:
-                        comments_accessible = True
-
-                    return {
-                        "post_url": data.get("post_url") or post_url,
-                        "comments_accessible": comments_accessible,
-                        "comments": normalized_comments,
-                        "total_collected": len(normalized_comments),
-                        "error": data.get("error"),
-                    }
-
-                except Exception as exc:
-                    failure_error = self._classify_agent_failure_error(exc=exc)
-                    if failure_error == "rate_limit_exceeded":
-                        return {
-                            "post_url": post_url,
-                            "comments_accessible": False,
-                            "comments": [],
-                            "total_collected": 0,
-                            "error": failure_error,
-                        }
-                    error_msg = str(exc).lower()
-                    is_retryable = any(
-                        marker in error_msg
-                        for marker in (
-                            "http 500",
-                            "connection",
-                            "timeout",
-                            "websocket",
-                            "failed to establish",
-                            "protocol error",
-                            "reserved bits",
-                            "client is stopping",
-                        )
-                    )
-                    if is_retryable and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Tentativa %s/%s falhou ao coletar comentarios: %s. Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            str(exc)[:120],
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-                    return {
-                        "post_url": post_url,
-                        "comments_accessible": False,
-                        "comments": [],
-                        "total_collected": 0,
-                        "error": str(exc),
-                    }
-                finally:
-                    if callable(restore_event_bus):
-                        restore_event_bus()
-                    if browser_session:
-                        await self._detach_browser_session(browser_session)
+        prepared_state = self._prepare_storage_state(storage_state)
+        storage_state_file = self._ensure_storage_state_file(prepared_state)
 
+        ctx = self._build_agent_run_context(
+            _POST_COMMENTS_TASK_TMPL.format_map(
+                {
+                    "post_url": post_url,
+                    "max_comments": safe_max_comments,
+                    "max_scrolls": safe_max_scrolls,
+                }
+            ),
+            prepared_state,
+            storage_state_file,
+            max_retries,
+        )
+        result = await self._retry_agent_attempts(
+            lambda attempt: self._scrape_post_comments_once(ctx, post_url, safe_max_comments, attempt),
+            max_retries,
+            retry_delay,
+        )
+        if result is None:
             return {
                 "post_url": post_url,
                 "comments_accessible": False,
@@ -1912,8 +2402,76 @@ class BrowserUseAgent:
                 "total_collected": 0,
                 "error": "all_retries_failed",
             }
+        return result
+
+    async def _scrape_profile_basic_info_once(
+        self,
+        ctx: _AgentRunContext,
+        profile_url: str,
+        attempt: int,
+    ) -> Dict[str, Any]:
+        max_retries = ctx.max_retries
+        can_retry = attempt < max_retries
+        browser_session = None
+        restore_event_bus = None
+        try:
+            logger.info(
+                "🤖 Browser Use: Extraindo dados do perfil %s (tentativa %s/%s)",
+                profile_url,
+                attempt,
+                max_retries,
+            )
+
+            cdp_url = self._select_cdp_url_for_attempt(ctx, attempt)
+            if cdp_url is None:
+                cdp_url = await self._get_cached_cdp_url()
+
+            browser_session = self._create_browser_session(cdp_url, storage_state=ctx.storage_state_for_session)
+            agent = self._create_agent(
+                task=ctx.task,
+                llm=self._get_llm(),
+                browser_session=browser_session,
+            )
+
+            restore_event_bus = self._patch_event_bus_for_stop(browser_session)
+            history = await self._run_agent(agent)
+            final_result = history.final_result() or ""
+
+            if (not history.is_successful()) and self._contains_protocol_error(final_result) and can_retry:
+                raise _RetryableAgentError("Sessao CDP instavel ao extrair perfil")
+
+            data = self._extract_json_object_with_key(final_result, "username")
+            if data is None:
+                if self._contains_protocol_error(final_result) and can_retry:
+                    raise _RetryableAgentError("Falha de protocolo ao extrair perfil")
+                failure_error = self._classify_agent_failure_error(
+                    final_result=final_result,
+                    history=history,
+                )
+                return {
+                    "error": failure_error,
+                    "raw_result": final_result,
+                }
+
+            return data
+
+        except _RetryableAgentError:
+            raise
+        except Exception as exc:
+            is_retryable = (
+                isinstance(exc, asyncio.TimeoutError)
+                or _RETRYABLE_ERROR_RE.search(str(exc)) is not None
+            )
+            if is_retryable and can_retry:
+                raise _RetryableAgentError(
+                    f"⚠️ Falha transitoria ao extrair perfil: {str(exc)[:120]}"
+                ) from exc
+            return {"error": str(exc)}
         finally:
-            self._cleanup_storage_state_temp_file(storage_state_file)
+            if callable(restore_event_bus):
+                restore_event_bus()
+            if browser_session:
+                await self._detach_browser_session(browser_session)
 
     async def scrape_profile_basic_info(
         self,
@@ -1925,321 +2483,114 @@ class BrowserUseAgent:
         """
         max_retries = getattr(settings, "browser_use_max_retries", 3)
         retry_delay = 5
-        reconnect_url = self._get_browserless_reconnect_url(storage_state)
-        session_info = self._get_browserless_session_info(storage_state)
-        session_connect_url = session_info.get("connect") if isinstance(session_info.get("connect"), str) else None
-        clean_storage_state = self._sanitize_storage_state(storage_state)
-        storage_state_file = self._write_storage_state_temp_file(storage_state)
-        storage_state_for_session: Optional[Union[Dict[str, Any], str]]
-        storage_state_for_session = storage_state_file or clean_storage_state
-
-        try:
-            for attempt in range(1, max_retries + 1):
-                browser_session = None
-                restore_event_bus = None
-                try:
-                    logger.info(
-                        "🤖 Browser Use: Extraindo dados do perfil %s (tentativa %s/%s)",
-                        profile_url,
-                        attempt,
-                        max_retries,
-                    )
-
-                    use_reconnect = bool(reconnect_url and attempt == 1)
-                    use_session_connect = bool((not reconnect_url) and session_connect_url and attempt == 1)
-                    if use_reconnect:
-                        cdp_url = self._ensure_ws_token(reconnect_url)
-                    elif use_session_connect:
-                        cdp_url = self._ensure_ws_token(session_connect_url)
-                    else:
-                        cdp_url = await self._resolve_browserless_cdp_url()
-
-                    task = f"""
-                    Você está em um navegador autenticado no Instagram.
-                    Extraia os dados do perfil em JSON puro.
-
-                    PERFIL:
-                    - URL: {profile_url}
-
-                    PASSOS:
-                    1) Navegue para a URL do perfil na aba atual.
-                    2) Aguarde a página carregar.
-                    3) Se houver modal de cookies, aceite.
-                    4) Extraia os campos visíveis do perfil.
-
-                    FORMATO (JSON puro):
-                    {{
-                      "username": "string ou null",
-                      "full_name": "string ou null",
-                      "bio": "string ou null",
-                      "is_private": true/false,
-                      "follower_count": número inteiro ou null,
-                      "following_count": número inteiro ou null,
-                      "post_count": número inteiro ou null,
-                      "verified": true/false
-                    }}
-
-                    REGRAS:
-                    - Não abra nova aba.
-                    - Não invente dados.
-                    - Se não conseguir um campo, retorne null.
-                    """
-
-                    browser_session = self._create_browser_session(cdp_url, storage_state=storage_state_for_session)
-                    llm = ChatOpenAI(model=self.model, api_key=self.api_key)
-                    agent = self._create_agent(
-                        task=task,
-                        llm=llm,
-                        browser_session=browser_session,
-                    )
-
-                    restore_event_bus = self._patch_event_bus_for_stop(browser_session)
-                    history = await agent.run()
-                    final_result = history.final_result() or ""
-
-                    if (not history.is_successful()) and self._contains_protocol_error(final_result) and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "Sessao CDP instavel ao extrair perfil (%s/%s). Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    data = self._extract_json_object_with_key(final_result, "username")
-                    if data is None:
-                        if self._contains_protocol_error(final_result) and attempt < max_retries:
-                            wait_time = retry_delay * attempt
-                            logger.warning(
-                                "Falha de protocolo ao extrair perfil (%s/%s). Retentando em %ss...",
-                                attempt,
-                                max_retries,
-                                wait_time,
-                            )
-                            await asyncio.sleep(wait_time)
-                            continue
-                        failure_error = self._classify_agent_failure_error(
-                            final_result=final_result,
-                            history=history,
-                        )
-                        return {
-                            "error": failure_error,
-                            "raw_result": final_result,
-                        }
-
-                    return data
-
-                except Exception as exc:
-                    error_msg = str(exc).lower()
-                    is_retryable = any(
-                        marker in error_msg
-                        for marker in (
-                            "http 500",
-                            "connection",
-                            "timeout",
-                            "websocket",
-                            "failed to establish",
-                            "protocol error",
-                            "reserved bits",
-                            "client is stopping",
-                        )
-                    )
-                    if is_retryable and attempt < max_retries:
-                        wait_time = retry_delay * attempt
-                        logger.warning(
-                            "⚠️ Tentativa %s/%s falhou ao extrair perfil: %s. Retentando em %ss...",
-                            attempt,
-                            max_retries,
-                            str(exc)[:120],
-                            wait_time,
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-                    return {"error": str(exc)}
-                finally:
-                    if callable(restore_event_bus):
-                        restore_event_bus()
-                    if browser_session:
-                        await self._detach_browser_session(browser_session)
-
+        prepared_state = self._prepare_storage_state(storage_state)
+        storage_state_file = self._ensure_storage_state_file(prepared_state)
+
+        ctx = self._build_agent_run_context(
+            _PROFILE_BASIC_INFO_TASK_TMPL.format_map({"profile_url": profile_url}),
+            prepared_state,
+            storage_state_file,
+            max_retries,
+        )
+        result = await self._retry_agent_attempts(
+            lambda attempt: self._scrape_profile_basic_info_once(ctx, profile_url, attempt),
+            max_retries,
+            retry_delay,
+        )
+        if result is None:
             return {"error": "all_retries_failed"}
-        finally:
-            self._cleanup_storage_state_temp_file(storage_state_file)
+        return result
 
-    async def generic_scrape(
+    async def _generic_scrape_once(
         self,
+        ctx: _AgentRunContext,
         url: str,
-        prompt: str,
-        storage_state: Optional[Dict[str, Any]] = None,
+        attempt: int,
     ) -> Dict[str, Any]:
-        """
-        Scraping generico de qualquer site usando Browser Use + Browserless.
-        """
-        max_retries = getattr(settings, "browser_use_max_retries", 3)
-        retry_delay = 3
-        clean_storage_state = self._sanitize_storage_state(storage_state)
-        storage_state_file = self._write_storage_state_temp_file(storage_state)
-        storage_state_for_session: Optional[Union[Dict[str, Any], str]]
-        storage_state_for_session = storage_state_file or clean_storage_state
-
+        can_retry = attempt < ctx.max_retries
+        browser_session = None
+        restore_event_bus = None
         try:
-            for attempt in range(1, max_retries + 1):
-                browser_session = None
-                restore_event_bus = None
-                try:
-                    cdp_url = await self._resolve_browserless_cdp_url()
-                    browser_session = self._create_browser_session(cdp_url, storage_state=storage_state_for_session)
-                    llm = ChatOpenAI(model=self.model, api_key=self.api_key)
-
-                    task = f"""
-                    Voce e um agente de scraping generico.
-
-                    URL alvo:
-                    - {url}
-
-                    Instrucoes do usuario (seguir literalmente):
-                    {prompt}
-
-                    Regras:
-                    - Use apenas a aba atual.
-                    - Nao invente dados.
-                    - Se algo falhar, retorne um JSON com campo "error".
-                    - Retorne no final APENAS o formato pedido pelo usuario.
-                    """
-
-                    agent = self._create_agent(
-                        task=task,
-                        llm=llm,
-                        browser_session=browser_session,
-                    )
-
-                    restore_event_bus = self._patch_event_bus_for_stop(browser_session)
-                    history = await agent.run()
-                    final_result = history.final_result() or ""
-
-                    if (not history.is_successful()) and self._contains_protocol_error(final_result) and attempt < max_retries:
-                        await asyncio.sleep(retry_delay * attempt)
-                        continue
-
-                    parsed = self._extract_first_json_value(final_result)
-                    return {
-                        "status": "success",
-                        "url": url,
-                        "data": parsed,
-                        "raw_result": final_result,
-                        "error": None,
-                    }
-                except Exception as exc:
-                    if attempt < max_retries:
-                        await asyncio.sleep(retry_delay * attempt)
-                        continue
-                    return {
-                        "status": "failed",
-                        "url": url,
-                        "data": None,
-                        "raw_result": None,
-                        "error": str(exc),
-                    }
-                finally:
-                    if callable(restore_event_bus):
-                        restore_event_bus()
-                    if browser_session:
-                        await self._detach_browser_session(browser_session)
-        finally:
-            self._cleanup_storage_state_temp_file(storage_state_file)
-
-    async def scroll_and_load_more(
-        self,
-        url: str,
-        scroll_count: int = 5,
-    ) -> Dict[str, Any]:
-        """
-        Simula scroll infinito para carregar mais conteúdo.
+            # Scraping generico usa sempre o CDP padrao (sem reconnect do Instagram).
+            cdp_url = await self._get_cached_cdp_url()
+            browser_session = self._create_browser_session(cdp_url, storage_state=ctx.storage_state_for_session)
+            agent = self._create_agent(
+                task=ctx.task,
+                llm=self._get_llm(),
+                browser_session=browser_session,
+            )
 
-        Args:
-            url: URL da página
-            scroll_count: Número de scrolls a realizar
+            restore_event_bus = self._patch_event_bus_for_stop(browser_session)
+            history = await self._run_agent(agent)
+            final_result = history.final_result() or ""
 
-        Returns:
-            Dados capturados após scrolls
-        """
-        try:
-            logger.info(f"📜 Iniciando scroll em: {url}")
+            if (not history.is_successful()) and self._contains_protocol_error(final_result) and can_retry:
+                raise _RetryableAgentError("Sessao CDP instavel no scraping generico")
 
-            # Implementação será feita com Browserless + JavaScript
-            result = {
+            parsed = self._extract_first_json_value(final_result)
+            return {
+                "status": "success",
                 "url": url,
-                "scroll_count": scroll_count,
-                "screenshots": [],
-                "html_content": [],
+                "data": parsed,
+                "raw_result": final_result,
+                "error": None,
             }
-
-            logger.info(f"✅ Scroll completado em: {url}")
-            return result
-
-        except Exception as e:
-            logger.error(f"❌ Erro ao fazer scroll: {e}")
+        except _RetryableAgentError:
             raise
+        except Exception as exc:
+            # Qualquer falha e retentada aqui; o CDP so e invalidado por erro de protocolo.
+            if can_retry:
+                raise _RetryableAgentError(
+                    f"Falha no scraping generico: {str(exc)[:120]}",
+                    invalidate_cdp=False,
+                ) from exc
+            return {
+                "status": "failed",
+                "url": url,
+                "data": None,
+                "raw_result": None,
+                "error": str(exc),
+            }
+        finally:
+            if callable(restore_event_bus):
+                restore_event_bus()
+            if browser_session:
+                await self._detach_browser_session(browser_session)
 
-    async def click_and_wait(
+    async def generic_scrape(
         self,
         url: str,
-        selector: str,
-        wait_for_selector: Optional[str] = None,
+        prompt: str,
+        storage_state: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
-        Clica em um elemento e aguarda carregamento.
-
-        Args:
-            url: URL da página
-            selector: Seletor CSS do elemento a clicar
-            wait_for_selector: Seletor CSS para aguardar após clique
-
-        Returns:
-            Dados capturados após clique
+        Scraping generico de qualquer site usando Browser Use + Browserless.
         """
-        try:
-            logger.info(f"🖱️ Clicando em: {selector}")
-
-            result = {
+        max_retries = getattr(settings, "browser_use_max_retries", 3)
+        retry_delay = 3
+        prepared_state = self._prepare_storage_state(storage_state)
+        storage_state_file = self._ensure_storage_state_file(prepared_state)
+
+        ctx = self._build_agent_run_context(
+            _GENERIC_SCRAPE_TASK_TMPL.format_map({"url": url, "prompt": prompt}),
+            prepared_state,
+            storage_state_file,
+            max_retries,
+        )
+        result = await self._retry_agent_attempts(
+            lambda attempt: self._generic_scrape_once(ctx, url, attempt),
+            max_retries,
+            retry_delay,
+        )
+        if result is None:
+            return {
+                "status": "failed",
                 "url": url,
-                "clicked_selector": selector,
-                "screenshot": None,
-                "html_content": None,
+                "data": None,
+                "raw_result": None,
+                "error": "all_retries_failed",
             }
-
-            logger.info(f"✅ Clique executado")
-            return result
-
-        except Exception as e:
-            logger.error(f"❌ Erro ao clicar: {e}")
-            raise
-
-    async def extract_visible_text(
-        self,
-        html: str,
-        selector: str,
-    ) -> str:
-        """
-        Extrai texto visível de um elemento HTML.
-
-        Args:
-            html: Conteúdo HTML
-            selector: Seletor CSS
-
-        Returns:
-            Texto extraído
-        """
-        try:
-            # Implementação com BeautifulSoup ou similar
-            logger.info(f"📝 Extraindo texto de: {selector}")
-            return ""
-
-        except Exception as e:
-            logger.error(f"❌ Erro ao extrair texto: {e}")
-            raise
+        return result
 
 
 # Instância global do agente
@@ -7,11 +7,128 @@ import httpx
 import base64
 import logging
 import asyncio
-from typing import Optional, Dict, Any
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Union, Callable, Awaitable, NamedTuple
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+_SESSION_ENDPOINT_FIELD = "browserWSEndpoint"
+# Endpoint da sessao persistente do scrape corrente (propaga para tasks do gather).
+_session_endpoint: ContextVar[Optional[str]] = ContextVar("browserless_session_endpoint", default=None)
+
+# Funcao do endpoint /function: navega uma vez e devolve HTML + screenshot juntos.
+_RENDER_BUNDLE_CODE = """
+export default async function ({ page, context }) {
+  if (context.userAgent) {
+    await page.setUserAgent(context.userAgent);
+  }
+  if (context.viewport) {
+    await page.setViewport(context.viewport);
+  }
+  if (context.cookies && context.cookies.length) {
+    await page.setCookie(...context.cookies);
+  }
+  await page.goto(context.url, { waitUntil: "networkidle2", timeout: context.timeout });
+  const html = await page.content();
+  const screenshot = await page.screenshot({ fullPage: context.fullPage, encoding: "base64" });
+  return { data: { html, screenshot }, type: "application/json" };
+}
+"""
+
+_DATA_FIELD = b'"data"'
+_NOT_ALLOWED = b"not allowed"
+# Mensagens de validacao do Browserless pre-codificadas para os campos opcionais.
+_FIELD_ERROR_NEEDLES = {
+    field: f'"{field}" is not allowed'.encode()
+    for field in ("fullPage", "timeout", "waitFor", "cookies", "userAgent", "viewport")
+}
+# Resolucoes desktop comuns; a escolhida acompanha o user-agent enviado.
+_VIEWPORTS = (
+    (1920, 1080),
+    (1536, 864),
+    (1440, 900),
+    (1366, 768),
+)
+_BASE64_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")
+
+
+class _LoopResources(NamedTuple):
+    """Objetos asyncio/httpx presos ao event loop em que foram criados."""
+
+    client: httpx.AsyncClient
+    semaphore: asyncio.Semaphore
+    rate_lock: asyncio.Lock
+
+
+class _BrowserlessStatusError(RuntimeError):
+    """Resposta HTTP de erro do Browserless; guarda o status para o chamador decidir."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _viewport_for(user_agent: Optional[str]) -> Optional[Dict[str, int]]:
+    """Viewport estavel por user-agent (mesma resolucao em todos os renders do scrape)."""
+    if not user_agent:
+        return None
+    width, height = _VIEWPORTS[zlib.crc32(user_agent.encode()) % len(_VIEWPORTS)]
+    return {"width": width, "height": height}
+
+
+async def _b64encode_stream(response: httpx.Response, chunk_size: int = 64 * 1024) -> str:
+    """
+    Codifica o corpo em base64 conforme os chunks chegam (fronteiras multiplas de 3
+    bytes), sem manter a imagem inteira em memoria junto da versao codificada.
+    """
+    parts: list[str] = []
+    carry = b""
+    async for chunk in response.aiter_bytes(chunk_size):
+        if carry:
+            chunk = carry + chunk
+        cut = len(chunk) - len(chunk) % 3
+        if cut:
+            parts.append(base64.b64encode(chunk[:cut]).decode("ascii"))
+        carry = chunk[cut:]
+    if carry:
+        parts.append(base64.b64encode(carry).decode("ascii"))
+    return "".join(parts)
+
+
+def _scan_base64_data_field(content: bytes) -> Optional[str]:
+    """
+    Localiza o campo "data" (base64) direto nos bytes da resposta, sem montar o
+    dict inteiro. Retorna None se o formato nao for o esperado.
+    """
+    key_pos = content.find(_DATA_FIELD)
+    if key_pos < 0:
+        return None
+    # So aceita "data" como chave: depois dele (e de espacos) precisa vir ":".
+    # Um valor "data" (ex.: {"type":"data",...}) cai no parser JSON completo.
+    colon_pos = key_pos + len(_DATA_FIELD)
+    while colon_pos < len(content) and content[colon_pos] in b" \t\r\n":
+        colon_pos += 1
+    if colon_pos >= len(content) or content[colon_pos] != ord(":"):
+        return None
+    start = colon_pos + 1
+    while start < len(content) and content[start] in b" \t\r\n":
+        start += 1
+    if start >= len(content) or content[start] != ord('"'):
+        return None
+    end = content.find(b'"', start + 1)
+    if end < 0:
+        return None
+    value = content[start + 1:end]
+    # base64 nunca tem escapes; qualquer outro byte indica JSON que precisa do parser.
+    if not value or not _BASE64_BYTES.issuperset(value):
+        return None
+    return value.decode("ascii")
+
 
 class BrowserlessClient:
     """Cliente para comunicação com Browserless."""
@@ -22,19 +139,154 @@ class BrowserlessClient:
         self.timeout = settings.request_timeout
         self.max_retries = max(1, settings.browserless_request_retries)
         self.retry_backoff_seconds = max(0.1, settings.browserless_retry_backoff_seconds)
-        self.semaphore = asyncio.Semaphore(max(1, settings.browserless_max_concurrency))
-        self.client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout))
+        # Limitador por intervalo minimo entre requisicoes (evita 429 em rajadas).
+        rps = settings.browserless_rps
+        self._min_interval = 1.0 / rps if rps > 0 else 0.0
+        self._next_request_at = 0.0
+        # Cache curto de renders (screenshot/HTML) por URL + sessao: o mesmo perfil
+        # costuma ser renderizado mais de uma vez no mesmo scrape.
+        self._render_cache: "OrderedDict[tuple, tuple[float, Union[str, bytes]]]" = OrderedDict()
+        # Renders em andamento pela mesma chave do cache: chamadas concorrentes
+        # identicas aguardam a mesma requisicao em vez de renderizar de novo.
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        # AsyncClient, semaforo e lock sao criados no primeiro uso, um conjunto por
+        # event loop (a instancia global e criada no import, antes do loop existir).
+        self._loop_resources: Dict[asyncio.AbstractEventLoop, _LoopResources] = {}
+        # Desligado na primeira vez que o Browserless recusar browserWSEndpoint no payload.
+        self._session_endpoint_supported = True
+        # Desligado quando o Browserless nao expoe /function (versoes antigas).
+        self._function_supported = True
+
+    def _build_client(self) -> httpx.AsyncClient:
+        # Pool keep-alive dimensionado para reaproveitar conexoes entre screenshot,
+        # content e execute do mesmo scrape; headers fixos ficam no cliente.
+        limits = httpx.Limits(
+            max_keepalive_connections=32,
+            max_connections=64,
+            keepalive_expiry=60,
+        )
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            },
+            transport=httpx.AsyncHTTPTransport(retries=2, limits=limits),
+        )
+
+    def _render_cache_key(self, endpoint: str, payload: Dict[str, Any]) -> tuple:
+        cookies = payload.get("cookies") or ()
+        cookie_key = tuple(
+            sorted(
+                (str(cookie.get("name")), str(cookie.get("value")))
+                for cookie in cookies
+                if isinstance(cookie, dict)
+            )
+        )
+        return (
+            endpoint,
+            payload.get("url"),
+            payload.get("fullPage"),
+            payload.get("waitFor"),
+            payload.get("userAgent"),
+            cookie_key,
+        )
+
+    def _get_cached_render(self, key: tuple) -> Optional[Union[str, bytes]]:
+        """Retorna um render ainda dentro do TTL."""
+        entry = self._render_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= settings.browserless_render_cache_ttl_seconds:
+            del self._render_cache[key]
+            return None
+        self._render_cache.move_to_end(key)
+        return value
+
+    def _store_cached_render(self, key: tuple, value: Optional[Union[str, bytes]]) -> None:
+        if not value or settings.browserless_render_cache_ttl_seconds <= 0:
+            return
+        self._render_cache[key] = (time.monotonic(), value)
+        self._render_cache.move_to_end(key)
+        while len(self._render_cache) > 32:
+            self._render_cache.popitem(last=False)
+
+    async def _coalesce(self, key: tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa fetch() uma vez por chave; chamadas simultaneas aguardam o mesmo resultado."""
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.set_exception(RuntimeError("Render cancelado"))
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Marca a excecao como lida quando ninguem mais aguardava o render.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _respect_rate(self) -> None:
+        """Aguarda o proximo slot livre do limitador de requisicoes."""
+        if self._min_interval <= 0:
+            return
+        async with self._resources().rate_lock:
+            now = time.monotonic()
+            wait = self._next_request_at - now
+            self._next_request_at = max(now, self._next_request_at) + self._min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Backoff exponencial: base, 2*base, 4*base..."""
+        return self.retry_backoff_seconds * (2 ** (attempt - 1))
+
+    def _resources(self) -> _LoopResources:
+        """Retorna cliente, semaforo e lock do event loop corrente, criando-os se necessario."""
+        loop = asyncio.get_running_loop()
+        resources = self._loop_resources.get(loop)
+        if resources is not None and not resources.client.is_closed:
+            return resources
+        # Loops ja fechados nao voltam a rodar; seus clientes morreram com eles.
+        for stale_loop in [other for other in self._loop_resources if other.is_closed()]:
+            del self._loop_resources[stale_loop]
+        resources = _LoopResources(
+            client=self._build_client(),
+            semaphore=asyncio.Semaphore(max(1, settings.browserless_max_concurrency)),
+            rate_lock=asyncio.Lock(),
+        )
+        self._loop_resources[loop] = resources
+        return resources
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Retorna o AsyncClient do event loop corrente, criando-o se necessario."""
+        return self._resources().client
 
     def _is_field_validation_error(self, response: httpx.Response, fields: list[str]) -> bool:
         if response.status_code != 400:
             return False
         try:
-            message = response.text or ""
+            body = response.content or b""
         except Exception:
             return False
-        if "not allowed" not in message:
+        if _NOT_ALLOWED not in body:
             return False
-        return any(f'"{field}" is not allowed' in message for field in fields)
+        return any(
+            (_FIELD_ERROR_NEEDLES.get(field) or f'"{field}" is not allowed'.encode()) in body
+            for field in fields
+        )
 
     def _strip_payload_fields(self, payload: Dict[str, Any], fields: list[str]) -> Dict[str, Any]:
         return {key: value for key, value in payload.items() if key not in fields}
@@ -52,48 +304,60 @@ class BrowserlessClient:
         payload: Dict[str, Any],
         url_for_log: str,
         fallback_fields: Optional[list[str]] = None,
+        stream: bool = False,
     ) -> httpx.Response:
+        """
+        POST com retentativas. Com stream=True a resposta 200 volta sem o corpo
+        lido; o chamador consome e fecha (aclose).
+        """
         last_exc: Optional[Exception] = None
         full_url = f"{self.host}{endpoint}"
+        resources = self._resources()
+        client = resources.client
+
+        session_endpoint = _session_endpoint.get()
+        if session_endpoint and self._session_endpoint_supported:
+            payload = {**payload, _SESSION_ENDPOINT_FIELD: session_endpoint}
+            fallback_fields = [*(fallback_fields or []), _SESSION_ENDPOINT_FIELD]
 
         for attempt in range(1, self.max_retries + 1):
             try:
-                async with self.semaphore:
-                    response = await self.client.post(
-                        full_url,
-                        json=payload,
-                        headers=self._get_headers(),
-                    )
+                async with resources.semaphore:
+                    await self._respect_rate()
+                    response = await self._send_post(client, full_url, payload, stream)
 
                 if response.status_code == 200:
                     return response
 
                 if fallback_fields and self._is_field_validation_error(response, fallback_fields):
+                    if _SESSION_ENDPOINT_FIELD in payload and self._is_field_validation_error(
+                        response, [_SESSION_ENDPOINT_FIELD]
+                    ):
+                        self._session_endpoint_supported = False
+                        logger.info("Browserless nao aceita sessao persistente nas rotas REST; desativando.")
                     fallback_payload = self._strip_payload_fields(payload, fallback_fields)
-                    async with self.semaphore:
-                        response = await self.client.post(
-                            full_url,
-                            json=fallback_payload,
-                            headers=self._get_headers(),
-                        )
+                    async with resources.semaphore:
+                        await self._respect_rate()
+                        response = await self._send_post(client, full_url, fallback_payload, stream)
                     if response.status_code == 200:
                         return response
 
                 retriable_statuses = {408, 429, 500, 502, 503, 504}
                 if response.status_code in retriable_statuses and attempt < self.max_retries:
-                    await asyncio.sleep(self.retry_backoff_seconds * attempt)
+                    await asyncio.sleep(self._retry_delay(attempt))
                     continue
 
                 body = self._safe_response_text(response)
-                raise RuntimeError(
+                raise _BrowserlessStatusError(
                     f"Browserless {endpoint} falhou para {url_for_log} "
-                    f"(status={response.status_code}, body={body})"
+                    f"(status={response.status_code}, body={body})",
+                    response.status_code,
                 )
 
             except (httpx.TimeoutException, httpx.NetworkError, httpx.TransportError) as exc:
                 last_exc = exc
                 if attempt < self.max_retries:
-                    await asyncio.sleep(self.retry_backoff_seconds * attempt)
+                    await asyncio.sleep(self._retry_delay(attempt))
                     continue
 
         if last_exc:
@@ -102,16 +366,102 @@ class BrowserlessClient:
             ) from last_exc
         raise RuntimeError(f"Browserless {endpoint} falhou para {url_for_log}")
 
+    async def _send_post(
+        self,
+        client: httpx.AsyncClient,
+        full_url: str,
+        payload: Dict[str, Any],
+        stream: bool,
+    ) -> httpx.Response:
+        if not stream:
+            return await client.post(full_url, json=payload)
+        request = client.build_request("POST", full_url, json=payload)
+        response = await client.send(request, stream=True)
+        if response.status_code != 200:
+            # Respostas de erro sao pequenas; le e fecha para a checagem de validacao.
+            await response.aread()
+        return response
+
+    async def _open_session(self) -> Dict[str, Any]:
+        """Cria uma sessao persistente no Browserless (API /session)."""
+        client = await self._get_client()
+        payload = {
+            "ttl": settings.browserless_session_ttl_ms,
+            "stealth": settings.browserless_session_stealth,
+            "headless": settings.browserless_session_headless,
+        }
+        for path in ("/session", "/chromium/session"):
+            try:
+                response = await client.post(
+                    f"{self.host}{path}",
+                    params={"token": self.token},
+                    json=payload,
+                )
+            except httpx.HTTPError as exc:
+                logger.warning("Falha ao criar sessao persistente do Browserless: %s", exc)
+                return {}
+            if response.status_code == 404:
+                continue
+            if response.status_code >= 400:
+                logger.warning(
+                    "Sessao persistente do Browserless recusada (status=%s, body=%s)",
+                    response.status_code,
+                    self._safe_response_text(response),
+                )
+                return {}
+            return response.json()
+        return {}
+
+    async def _close_session(self, stop_url: Optional[str]) -> None:
+        if not stop_url:
+            return
+        url = stop_url if not stop_url.startswith("/") else f"{self.host}{stop_url}"
+        params = {"force": "true"}
+        if "token=" not in url:
+            params["token"] = self.token
+        try:
+            client = await self._get_client()
+            await client.delete(url, params=params)
+        except Exception as exc:
+            logger.warning("Falha ao encerrar sessao persistente do Browserless: %s", exc)
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Mantem uma sessao persistente do Browserless durante o bloco: as chamadas
+        REST feitas dentro dele enviam o browserWSEndpoint da sessao e reutilizam
+        o mesmo navegador. Opt-in via BROWSERLESS_REST_SESSION_ENABLED.
+        """
+        if not settings.browserless_rest_session_enabled or not self._session_endpoint_supported:
+            yield None
+            return
+
+        session_info = await self._open_session()
+        connect_url = session_info.get("connect") if session_info else None
+        if connect_url and "token=" not in connect_url:
+            separator = "&" if "?" in connect_url else "?"
+            connect_url = f"{connect_url}{separator}token={self.token}"
+        context_token = _session_endpoint.set(connect_url)
+        try:
+            yield connect_url
+        finally:
+            _session_endpoint.reset(context_token)
+            if session_info:
+                await self._close_session(session_info.get("stop"))
+
     async def close(self):
         """Fecha a conexão com Browserless."""
-        await self.client.aclose()
-
-    def _get_headers(self) -> Dict[str, str]:
-        """Retorna headers para requisições ao Browserless."""
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
+        current_loop = asyncio.get_running_loop()
+        loop_resources, self._loop_resources = self._loop_resources, {}
+        for loop, resources in loop_resources.items():
+            client = resources.client
+            if client.is_closed or loop.is_closed():
+                continue
+            if loop is current_loop:
+                await client.aclose()
+            elif loop.is_running():
+                # O cliente so pode ser fechado no loop dono das conexoes.
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
 
     async def screenshot(
         self,
@@ -121,7 +471,8 @@ class BrowserlessClient:
         timeout: int = 30000,
         cookies: Optional[list[dict]] = None,
         user_agent: Optional[str] = None,
-    ) -> str:
+        return_bytes: bool = False,
+    ) -> Union[str, bytes]:
         """
         Captura screenshot de uma URL.
 
@@ -130,9 +481,10 @@ class BrowserlessClient:
             full_page: Se True, captura a página inteira
             wait_for: Seletor CSS para esperar antes de capturar
             timeout: Timeout em ms
+            return_bytes: Se True, retorna os bytes da imagem sem codificar em base64
 
         Returns:
-            Screenshot em base64
+            Screenshot em base64 (ou bytes quando return_bytes=True)
         """
         try:
             payload = {
@@ -147,25 +499,47 @@ class BrowserlessClient:
                 payload["cookies"] = cookies
             if user_agent:
                 payload["userAgent"] = user_agent
+                payload["viewport"] = _viewport_for(user_agent)
+
+            cache_key = self._render_cache_key("/screenshot", payload) + (return_bytes,)
+            cached = self._get_cached_render(cache_key)
+            if cached is not None:
+                logger.info("Screenshot servido do cache: %s", url)
+                return cached
+
+            async def fetch() -> Union[str, bytes]:
+                response = await self._post_with_retry(
+                    endpoint="/screenshot",
+                    payload=payload,
+                    url_for_log=url,
+                    fallback_fields=["fullPage", "timeout", "cookies", "userAgent", "viewport"],
+                    stream=True,
+                )
 
-            response = await self._post_with_retry(
-                endpoint="/screenshot",
-                payload=payload,
-                url_for_log=url,
-                fallback_fields=["fullPage", "timeout", "cookies", "userAgent"],
-            )
-
-            # Alguns Browserless retornam JSON com base64, outros retornam bytes da imagem.
-            content_type = response.headers.get("content-type", "").lower()
-            if "application/json" in content_type:
-                screenshot_data = response.json().get("data")
-            else:
-                screenshot_data = base64.b64encode(response.content).decode("ascii")
-            logger.info(f"✅ Screenshot capturado: {url}")
-            return screenshot_data
+                # Alguns Browserless retornam JSON com base64, outros retornam bytes da imagem.
+                try:
+                    content_type = response.headers.get("content-type", "").lower()
+                    if "application/json" in content_type:
+                        await response.aread()
+                        screenshot_data = _scan_base64_data_field(response.content)
+                        if screenshot_data is None:
+                            screenshot_data = response.json().get("data")
+                        if return_bytes and screenshot_data:
+                            screenshot_data = base64.b64decode(screenshot_data)
+                    elif return_bytes:
+                        screenshot_data = await response.aread()
+                    else:
+                        screenshot_data = await _b64encode_stream(response)
+                finally:
+                    await response.aclose()
+                self._store_cached_render(cache_key, screenshot_data)
+                logger.info("✅ Screenshot capturado: %s", url)
+                return screenshot_data
+
+            return await self._coalesce(cache_key, fetch)
 
         except Exception as e:
-            logger.error(f"❌ Erro ao capturar screenshot de {url}: {e}")
+            logger.error("❌ Erro ao capturar screenshot de %s: %s", url, e)
             raise
 
     async def get_html(
@@ -175,7 +549,8 @@ class BrowserlessClient:
         timeout: int = 30000,
         cookies: Optional[list[dict]] = None,
         user_agent: Optional[str] = None,
-    ) -> str:
+        return_bytes: bool = False,
+    ) -> Union[str, bytes]:
         """
         Obtém HTML de uma URL.
 
@@ -183,9 +558,10 @@ class BrowserlessClient:
             url: URL a ser acessada
             wait_for: Seletor CSS para esperar antes de retornar
             timeout: Timeout em ms
+            return_bytes: Se True, retorna o corpo sem decodificar (para varreduras em bytes)
 
         Returns:
-            HTML da página
+            HTML da página (ou bytes quando return_bytes=True)
         """
         try:
             payload = {
@@ -199,27 +575,42 @@ class BrowserlessClient:
                 payload["cookies"] = cookies
             if user_agent:
                 payload["userAgent"] = user_agent
+                payload["viewport"] = _viewport_for(user_agent)
+
+            cache_key = self._render_cache_key("/content", payload) + (return_bytes,)
+            cached = self._get_cached_render(cache_key)
+            if cached is not None:
+                logger.info("HTML servido do cache: %s", url)
+                return cached
+
+            async def fetch() -> Union[str, bytes]:
+                response = await self._post_with_retry(
+                    endpoint="/content",
+                    payload=payload,
+                    url_for_log=url,
+                    fallback_fields=["timeout", "cookies", "userAgent", "viewport"],
+                )
 
-            response = await self._post_with_retry(
-                endpoint="/content",
-                payload=payload,
-                url_for_log=url,
-                fallback_fields=["timeout", "cookies", "userAgent"],
-            )
-
-            content_type = response.headers.get("content-type", "").lower()
-            if "application/json" in content_type:
-                try:
-                    html = response.json().get("data")
-                except ValueError:
+                content_type = response.headers.get("content-type", "").lower()
+                if "application/json" in content_type:
+                    try:
+                        html = response.json().get("data")
+                    except ValueError:
+                        html = response.text
+                    if return_bytes and isinstance(html, str):
+                        html = html.encode("utf-8")
+                elif return_bytes:
+                    html = response.content
+                else:
                     html = response.text
-            else:
-                html = response.text
-            logger.info(f"✅ HTML obtido: {url}")
-            return html
+                self._store_cached_render(cache_key, html)
+                logger.info("✅ HTML obtido: %s", url)
+                return html
+
+            return await self._coalesce(cache_key, fetch)
 
         except Exception as e:
-            logger.error(f"❌ Erro ao obter HTML de {url}: {e}")
+            logger.error("❌ Erro ao obter HTML de %s: %s", url, e)
             raise
 
     async def execute_script(
@@ -255,21 +646,97 @@ class BrowserlessClient:
                 payload["cookies"] = cookies
             if user_agent:
                 payload["userAgent"] = user_agent
+                payload["viewport"] = _viewport_for(user_agent)
 
             response = await self._post_with_retry(
                 endpoint="/execute",
                 payload=payload,
                 url_for_log=url,
-                fallback_fields=["timeout", "waitFor", "cookies", "userAgent"],
+                fallback_fields=["timeout", "waitFor", "cookies", "userAgent", "viewport"],
             )
             result = response.json().get("data")
-            logger.info(f"✅ Script executado em: {url}")
+            logger.info("✅ Script executado em: %s", url)
             return result
 
         except Exception as e:
-            logger.error(f"❌ Erro ao executar script em {url}: {e}")
+            logger.error("❌ Erro ao executar script em %s: %s", url, e)
             raise
 
+    async def render_bundle(
+        self,
+        url: str,
+        full_page: bool = True,
+        timeout: int = 30000,
+        cookies: Optional[list[dict]] = None,
+        user_agent: Optional[str] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Renderiza a URL uma unica vez via /function e retorna screenshot + HTML.
+
+        Args:
+            url: URL a ser renderizada
+            full_page: Se True, captura a página inteira
+            timeout: Timeout em ms
+
+        Returns:
+            {"screenshot": base64, "html": str}
+        """
+        screenshot_key = self._render_cache_key(
+            "/screenshot",
+            {"url": url, "fullPage": full_page, "cookies": cookies, "userAgent": user_agent},
+        ) + (False,)
+        html_key = self._render_cache_key(
+            "/content",
+            {"url": url, "cookies": cookies, "userAgent": user_agent},
+        ) + (False,)
+        cached_screenshot = self._get_cached_render(screenshot_key)
+        cached_html = self._get_cached_render(html_key)
+        if cached_screenshot is not None and cached_html is not None:
+            logger.info("Screenshot + HTML servidos do cache: %s", url)
+            return {"screenshot": cached_screenshot, "html": cached_html}
+
+        if not self._function_supported:
+            raise RuntimeError("Browserless /function indisponivel")
+
+        payload = {
+            "code": _RENDER_BUNDLE_CODE,
+            "context": {
+                "url": url,
+                "fullPage": full_page,
+                "timeout": timeout,
+                "cookies": cookies or [],
+                "userAgent": user_agent,
+                "viewport": _viewport_for(user_agent),
+            },
+        }
+
+        async def fetch() -> Dict[str, Optional[str]]:
+            try:
+                response = await self._post_with_retry(
+                    endpoint="/function",
+                    payload=payload,
+                    url_for_log=url,
+                )
+            except RuntimeError as exc:
+                if isinstance(exc, _BrowserlessStatusError) and exc.status_code == 404:
+                    self._function_supported = False
+                logger.warning("⚠️ Falha no render via /function de %s: %s", url, exc)
+                raise
+
+            body = response.json()
+            if isinstance(body, dict) and "html" not in body and isinstance(body.get("data"), dict):
+                body = body["data"]
+            if not isinstance(body, dict):
+                raise RuntimeError(f"Resposta inesperada do Browserless /function para {url}")
+
+            bundle = {"screenshot": body.get("screenshot"), "html": body.get("html")}
+            self._store_cached_render(screenshot_key, bundle["screenshot"])
+            self._store_cached_render(html_key, bundle["html"])
+            logger.info("✅ Screenshot + HTML obtidos em um render: %s", url)
+            return bundle
+
+        return await self._coalesce(("/function", screenshot_key, html_key), fetch)
+
     async def pdf(
         self,
         url: str,
@@ -298,11 +765,11 @@ class BrowserlessClient:
                 fallback_fields=["timeout"],
             )
             pdf_data = response.content
-            logger.info(f"✅ PDF gerado: {url}")
+            logger.info("✅ PDF gerado: %s", url)
             return pdf_data
 
         except Exception as e:
-            logger.error(f"❌ Erro ao gerar PDF de {url}: {e}")
+            logger.error("❌ Erro ao gerar PDF de %s: %s", url, e)
             raise
 
     async def health_check(self) -> bool:
@@ -313,14 +780,16 @@ class BrowserlessClient:
             True se acessível, False caso contrário
         """
         try:
-            response = await self.client.get(
-                f"{self.host}/health",
-                headers=self._get_headers(),
-            )
+            client = await self._get_client()
+            response = await client.get(f"{self.host}/health")
             is_healthy = response.status_code == 200
             status = "✅ Saudável" if is_healthy else "❌ Indisponível"
-            logger.info(f"Browserless status: {status}")
+            logger.info("Browserless status: %s", status)
             return is_healthy
         except Exception as e:
-            logger.error(f"❌ Erro ao verificar saúde do Browserless: {e}")
+            logger.error("❌ Erro ao verificar saúde do Browserless: %s", e)
             return False
+
+
+# Instância global do cliente (pool HTTP compartilhado entre os scrapers)
+browserless_client = BrowserlessClient()
@@ -10,20 +10,177 @@ import re
 import json
 import html as html_lib
 import unicodedata
+import uuid
+from contextvars import ContextVar
+from functools import lru_cache
 from urllib.parse import urlparse
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterable, List, Union
 from datetime import datetime, timezone, timedelta
 
-from app.scraper.browserless_client import BrowserlessClient
+from app.scraper.browserless_client import browserless_client
 from app.scraper.browser_use_agent import browser_use_agent
-from app.scraper.ai_extractor import AIExtractor
+from app.scraper.ai_extractor import ai_extractor
 from app.models import Profile, Post, Interaction, InteractionType
 from app.database import SessionLocal
+from config import settings
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import bindparam, func, insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 logger = logging.getLogger(__name__)
 
+# Marcadores de pagina de bloqueio/anti-bot; procurados so no inicio do HTML.
+_BLOCKED_PAGE_RE = re.compile(
+    r"(403 forbidden|you have been blocked|log ?in to continue|challenge-platform)",
+    re.IGNORECASE,
+)
+_BLOCKED_PAGE_SCAN_CHARS = 8192
+
+# Padroes usados a cada post/perfil; compilados uma vez no import.
+# Aceita href relativo ou absoluto (https://www.instagram.com/p/...), com espacos em volta do "=".
+_POST_HREF_RE = re.compile(
+    r'href\s*=\s*["\'](?:https?://(?:www\.)?instagram\.com)?(/(?:p|reel)/[A-Za-z0-9_-]+/?)(?:[?#][^"\']*)?["\']',
+    re.IGNORECASE,
+)
+# URL canonica de post/reel: path relativo ou URL do instagram.com, sem query/fragmento.
+_POST_PATH_RE = re.compile(r"(?:https?://(?:www\.)?instagram\.com)?(/(?:p|reel)/[A-Za-z0-9_-]+)/?$")
+_POST_HREF_BYTES_RE = re.compile(_POST_HREF_RE.pattern.encode(), re.IGNORECASE)
+_NUM_SUFFIX_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*([km]?)")
+_NUM_SUFFIX_MULTIPLIERS = {"": 1, "k": 1_000, "m": 1_000_000}
+# Palavras descartadas do texto relativo ("editado", "ago", "ha") numa unica passada.
+_RELATIVE_TIME_NOISE_RE = re.compile(r"\b(?:editado|editada|edited|ago|h[a\u00e1])\b")
+_RELATIVE_TIME_SEPARATORS = str.maketrans({"\u2022": " ", "\u00b7": " "})
+# Uma unica varredura para "<numero> <unidade>"; o grupo nomeado que casou indica a unidade.
+_RELATIVE_TIME_RE = re.compile(
+    r"(\d+(?:[.,]\d+)?)\s*(?:"
+    r"(?P<second>s|seg|segs|segundo|segundos|sec|secs|second|seconds)"
+    r"|(?P<minute>m|min|mins|minute|minutes|minuto|minutos)"
+    r"|(?P<hour>h|hr|hrs|hour|hours|hora|horas)"
+    r"|(?P<day>d|day|days|dia|dias)"
+    r"|(?P<week>w|wk|wks|week|weeks|sem|semana|semanas)"
+    r"|(?P<month>mo|month|months|mes|m[e\u00ea]s|meses)"
+    r"|(?P<year>y|yr|year|years|ano|anos)"
+    r")\b"
+)
+_NOW_TOKENS = frozenset({"now", "just now", "agora", "agora mesmo"})
+_TODAY_TOKENS = frozenset({"today", "hoje"})
+_YESTERDAY_TOKENS = frozenset({"yesterday", "ontem"})
+_RELATIVE_TIME_HOURS = {
+    "second": 1 / 3600,
+    "minute": 1 / 60,
+    "hour": 1,
+    "day": 24,
+    "week": 24 * 7,
+    "month": 24 * 30,
+    "year": 24 * 365,
+}
+_DE_RE = re.compile(r"\bde\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+_DAY_RE = re.compile(r"(\d{1,2})")
+_YEAR_RE = re.compile(r"(\d{2,4})")
+_JSON_DECODER = json.JSONDecoder()
+
+# Extracao deterministica do perfil a partir do HTML (_extract_profile_info_from_html).
+_PROFILE_USERNAME_RE = re.compile(r'"username":"([^"]+)"')
+_PROFILE_FULL_NAME_RE = re.compile(r'"full_name":"((?:\\.|[^"])*)"')
+_PROFILE_BIO_RE = re.compile(r'"biography":"((?:\\.|[^"])*)"')
+_PROFILE_IS_PRIVATE_RE = re.compile(r'"is_private":(true|false)')
+_PROFILE_VERIFIED_RE = re.compile(r'"is_verified":(true|false)')
+_PROFILE_FOLLOWERS_RE = re.compile(r'"edge_followed_by":\{"count":(\d+)')
+_PROFILE_FOLLOWING_RE = re.compile(r'"edge_follow":\{"count":(\d+)')
+_PROFILE_POST_COUNT_RE = re.compile(r'"edge_owner_to_timeline_media":\{"count":(\d+)')
+_OG_DESCRIPTION_RE = re.compile(
+    r'<meta[^>]+property=["\']og:description["\'][^>]+content=["\']([^"\']+)["\']',
+    re.IGNORECASE,
+)
+_OG_TITLE_RE = re.compile(
+    r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\']([^"\']+)["\']',
+    re.IGNORECASE,
+)
+_OG_DESC_NUMBER_RE = re.compile(r"(\d[\d\.,]*)")
+_OG_DESC_BIO_RE = re.compile(r"on Instagram:\s*\"([^\"]+)\"", re.IGNORECASE)
+_OG_TITLE_HANDLE_RE = re.compile(r"\s*\(@[^)]+\).*")
+_GRAPHQL_USER_MARKER = '"graphql":{"user":'
+
+# Posts por chamada de IA no fallback (varias imagens por requisicao pesam no contexto).
+_AI_POSTS_BATCH_SIZE = 4
+# Linhas por executemany ao gravar interacoes.
+_DB_INSERT_BATCH_SIZE = 1000
+
+# Statements de persistencia montados uma vez; listas IN entram por bindparam expanding.
+_POST_IDS_BY_URL = select(Post.post_url, Post.id).where(
+    Post.post_url.in_(bindparam("post_urls", expanding=True))
+)
+_EXISTING_INTERACTIONS = select(
+    Interaction.post_id,
+    Interaction.post_url,
+    Interaction.user_url,
+    Interaction.interaction_type,
+).where(
+    Interaction.user_url.in_(bindparam("user_urls", expanding=True)),
+    or_(
+        Interaction.post_url.in_(bindparam("post_urls", expanding=True)),
+        Interaction.post_id.in_(bindparam("post_ids", expanding=True)),
+    ),
+)
+_POST_INSERT = insert(Post.__table__)
+_PG_POST_INSERT = pg_insert(Post.__table__).on_conflict_do_nothing().returning(Post.__table__.c.post_url)
+_INTERACTION_INSERT = insert(Interaction.__table__)
+_PG_INTERACTION_INSERT = pg_insert(Interaction.__table__).on_conflict_do_nothing()
+
+# User-agent sorteado para o scrape em andamento (quando a sessao nao tem um salvo);
+# cada ponto de entrada publico define e reseta o valor via token.
+_scrape_user_agent: ContextVar[Optional[str]] = ContextVar("instagram_scrape_user_agent", default=None)
+
+
+def _utcnow_naive() -> datetime:
+    """Agora em UTC sem tzinfo (as colunas DateTime do banco sao naive em UTC)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@lru_cache(maxsize=4096)
+def _username_from_url(url: str) -> str:
+    """
+    Primeiro segmento do path da URL do perfil.
+
+    Aceita https://instagram.com/username, .../username/reels/, query strings e
+    fragmentos; sem esquema, ignora o host (instagram.com/username).
+    """
+    parsed = urlparse(url)
+    segments = parsed.path.strip("/").split("/")
+    if not parsed.netloc and len(segments) > 1 and "." in segments[0]:
+        segments = segments[1:]
+    return segments[0]
+
+
+def _profile_user_from_json_blob(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Objeto "user" do payload embutido no HTML (window._sharedData ou "graphql":{"user":...}).
+
+    Decodifica o JSON uma vez no offset encontrado; None quando nao ha payload valido.
+    """
+    idx = text.find("window._sharedData")
+    if idx != -1:
+        idx = text.find("{", idx)
+        if idx != -1:
+            try:
+                shared_data, _ = _JSON_DECODER.raw_decode(text, idx)
+                user = shared_data["entry_data"]["ProfilePage"][0]["graphql"]["user"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                user = None
+            if isinstance(user, dict) and user.get("username"):
+                return user
+
+    idx = text.find(_GRAPHQL_USER_MARKER)
+    if idx != -1:
+        try:
+            user, _ = _JSON_DECODER.raw_decode(text, idx + len(_GRAPHQL_USER_MARKER))
+        except ValueError:
+            user = None
+        if isinstance(user, dict) and user.get("username"):
+            return user
+    return None
+
 
 class InstagramScraper:
     """
@@ -32,48 +189,76 @@ class InstagramScraper:
     """
 
     def __init__(self):
-        self.browserless = BrowserlessClient()
-        self.ai_extractor = AIExtractor()
-        self.user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-        ]
+        # Instancias globais: o pool HTTP do Browserless e o cliente OpenAI sao
+        # reaproveitados por qualquer InstagramScraper criado.
+        self.browserless = browserless_client
+        self.ai_extractor = ai_extractor
+        self.user_agents = (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        )
 
     async def close(self):
         """Fecha conexões."""
         await self.browserless.close()
 
+    def _resolve_user_agent(self, storage_state: Optional[Dict[str, Any]]) -> str:
+        """
+        User-agent da sessao salva; sem ele, sorteia um da lista e o mantem ate o fim
+        do scrape corrente (perfil, posts e interacoes renderizados com o mesmo UA).
+        """
+        stored = browser_use_agent.get_user_agent(storage_state)
+        if stored:
+            return stored
+        user_agent = _scrape_user_agent.get()
+        if user_agent is None:
+            user_agent = random.choice(self.user_agents)
+            _scrape_user_agent.set(user_agent)
+        return user_agent
+
     def _get_random_delay(self, min_sec: float = 1, max_sec: float = 5) -> float:
         """Retorna delay aleatório para simular comportamento humano."""
         return random.uniform(min_sec, max_sec)
 
     def _extract_username_from_url(self, url: str) -> str:
         """Extrai username da URL do Instagram."""
-        # URL pode ser: https://instagram.com/username ou https://www.instagram.com/username/
-        parts = url.rstrip("/").split("/")
-        return parts[-1]
+        return _username_from_url(url)
 
-    def _extract_post_urls_from_html(self, html: str, max_posts: int) -> List[str]:
+    def _extract_post_urls_from_html(self, html: Union[str, bytes], max_posts: int) -> List[str]:
         """
         Extrai links canônicos de posts/reels (/p/... e /reel/...) a partir do HTML do perfil.
+        Aceita o HTML em bytes (sem decodificar o documento inteiro).
         """
         if not html:
             return []
 
-        matches = re.findall(r'href=["\'](/(?:p|reel)/[A-Za-z0-9_-]+/?)(?:\?[^"\']*)?["\']', html)
+        is_bytes = isinstance(html, bytes)
+        pattern = _POST_HREF_BYTES_RE if is_bytes else _POST_HREF_RE
         found: List[str] = []
-        for path in matches:
+        seen: set[str] = set()
+        # finditer para no max_posts-esimo link sem materializar todos os matches do HTML.
+        for match in pattern.finditer(html):
+            # Apenas o path capturado (ASCII) e decodificado.
+            path = match.group(1).decode("ascii") if is_bytes else match.group(1)
             normalized = path if path.startswith("/") else f"/{path}"
             if not normalized.endswith("/"):
                 normalized = f"{normalized}/"
             url = f"https://www.instagram.com{normalized}"
-            if url not in found:
-                found.append(url)
+            if url in seen:
+                continue
+            seen.add(url)
+            found.append(url)
             if len(found) >= max_posts:
                 break
         return found
 
+    def _looks_blocked(self, html: Optional[str]) -> bool:
+        """Indica se o HTML e uma tela de bloqueio (nao vale a chamada de IA)."""
+        if not html:
+            return False
+        return _BLOCKED_PAGE_RE.search(html[:_BLOCKED_PAGE_SCAN_CHARS]) is not None
+
     def _to_int_or_none(self, value: Any) -> Optional[int]:
         if value is None:
             return None
@@ -87,14 +272,19 @@ class InstagramScraper:
         text = str(value).strip().lower()
         if not text:
             return None
+        # Caso comum: so digitos ("1234"), sem regex nem float.
+        if text.isascii() and text.isdigit():
+            return int(text)
 
-        match = re.search(r"(\d+(?:[.,]\d+)?)\s*([km]?)", text)
+        match = _NUM_SUFFIX_RE.search(text)
         if not match:
             return None
 
         number_text = match.group(1)
-        suffix = match.group(2)
+        multiplier = _NUM_SUFFIX_MULTIPLIERS[match.group(2)]
 
+        if "," not in number_text and "." not in number_text:
+            return int(number_text) * multiplier
         if "," in number_text and "." not in number_text:
             parts = number_text.split(",")
             if len(parts[-1]) == 3:
@@ -113,20 +303,17 @@ class InstagramScraper:
         except ValueError:
             return None
 
-        if suffix == "k":
-            number *= 1_000
-        elif suffix == "m":
-            number *= 1_000_000
-
-        return int(number)
+        return int(number * multiplier)
 
     def _normalize_post_item(self, item: Dict[str, Any], fallback_url: Optional[str] = None) -> Dict[str, Any]:
         post_url = item.get("post_url") or item.get("canonical_post_url") or fallback_url
         if isinstance(post_url, str):
             post_url = post_url.strip()
-            if post_url.startswith("/p/"):
-                post_url = f"https://www.instagram.com{post_url}"
-            if post_url and ("/p/" in post_url or "/reel/" in post_url) and not post_url.endswith("/"):
+            # Caso comum (path ou URL do post, com ou sem barra) resolvido num unico match.
+            path_match = _POST_PATH_RE.match(post_url)
+            if path_match:
+                post_url = f"https://www.instagram.com{path_match.group(1)}/"
+            elif ("/p/" in post_url or "/reel/" in post_url) and not post_url.endswith("/"):
                 post_url = f"{post_url}/"
         else:
             post_url = fallback_url
@@ -135,10 +322,12 @@ class InstagramScraper:
         if caption is None:
             caption = item.get("full_caption_text")
         if caption is not None:
-            caption = str(caption).strip() or None
+            caption = (caption if isinstance(caption, str) else str(caption)).strip() or None
 
         posted_at = item.get("posted_at")
-        if isinstance(posted_at, datetime):
+        if isinstance(posted_at, str):
+            posted_at = posted_at.strip() or None
+        elif isinstance(posted_at, datetime):
             posted_at = posted_at.isoformat()
         elif posted_at is not None:
             posted_at = str(posted_at).strip() or None
@@ -168,14 +357,14 @@ class InstagramScraper:
         extracted: Dict[str, Any] = {}
         text = html_content
 
-        def _bool_from_match(pattern: str) -> Optional[bool]:
-            match = re.search(pattern, text)
+        def _bool_from_match(pattern: "re.Pattern[str]") -> Optional[bool]:
+            match = pattern.search(text)
             if not match:
                 return None
             return match.group(1).lower() == "true"
 
-        def _int_from_match(pattern: str) -> Optional[int]:
-            match = re.search(pattern, text)
+        def _int_from_match(pattern: "re.Pattern[str]") -> Optional[int]:
+            match = pattern.search(text)
             if not match:
                 return None
             try:
@@ -183,44 +372,60 @@ class InstagramScraper:
             except ValueError:
                 return None
 
-        username_match = re.search(r'"username":"([^"]+)"', text)
-        if username_match:
-            extracted["username"] = username_match.group(1)
-        elif username_hint:
-            extracted["username"] = username_hint
-
-        full_name_match = re.search(r'"full_name":"((?:\\.|[^"])*)"', text)
-        if full_name_match:
-            raw_full_name = full_name_match.group(1)
-            try:
-                extracted["full_name"] = json.loads(f'"{raw_full_name}"')
-            except Exception:
-                extracted["full_name"] = raw_full_name.replace('\\"', '"').replace("\\n", "\n")
+        # Caminho rapido: payload JSON do perfil decodificado uma vez, leitura por chave.
+        user_blob = _profile_user_from_json_blob(text)
+        if user_blob is not None:
+
+            def _edge_count(key: str) -> Optional[int]:
+                edge = user_blob.get(key)
+                count = edge.get("count") if isinstance(edge, dict) else None
+                return count if isinstance(count, int) else None
+
+            extracted["username"] = user_blob.get("username")
+            extracted["full_name"] = user_blob.get("full_name")
+            extracted["bio"] = user_blob.get("biography")
+            is_private = user_blob.get("is_private")
+            extracted["is_private"] = is_private if isinstance(is_private, bool) else None
+            verified = user_blob.get("is_verified")
+            extracted["verified"] = verified if isinstance(verified, bool) else None
+            extracted["follower_count"] = _edge_count("edge_followed_by")
+            extracted["following_count"] = _edge_count("edge_follow")
+            extracted["post_count"] = _edge_count("edge_owner_to_timeline_media")
+        else:
+            username_match = _PROFILE_USERNAME_RE.search(text)
+            if username_match:
+                extracted["username"] = username_match.group(1)
+            elif username_hint:
+                extracted["username"] = username_hint
+
+            full_name_match = _PROFILE_FULL_NAME_RE.search(text)
+            if full_name_match:
+                raw_full_name = full_name_match.group(1)
+                try:
+                    extracted["full_name"] = json.loads(f'"{raw_full_name}"')
+                except Exception:
+                    extracted["full_name"] = raw_full_name.replace('\\"', '"').replace("\\n", "\n")
 
-        bio_match = re.search(r'"biography":"((?:\\.|[^"])*)"', text)
-        if bio_match:
-            raw_bio = bio_match.group(1)
-            try:
-                extracted["bio"] = json.loads(f'"{raw_bio}"')
-            except Exception:
-                extracted["bio"] = raw_bio.replace('\\"', '"').replace("\\n", "\n")
+            bio_match = _PROFILE_BIO_RE.search(text)
+            if bio_match:
+                raw_bio = bio_match.group(1)
+                try:
+                    extracted["bio"] = json.loads(f'"{raw_bio}"')
+                except Exception:
+                    extracted["bio"] = raw_bio.replace('\\"', '"').replace("\\n", "\n")
 
-        extracted["is_private"] = _bool_from_match(r'"is_private":(true|false)')
-        extracted["verified"] = _bool_from_match(r'"is_verified":(true|false)')
-        extracted["follower_count"] = _int_from_match(r'"edge_followed_by":\{"count":(\d+)')
-        extracted["following_count"] = _int_from_match(r'"edge_follow":\{"count":(\d+)')
-        extracted["post_count"] = _int_from_match(r'"edge_owner_to_timeline_media":\{"count":(\d+)')
+            extracted["is_private"] = _bool_from_match(_PROFILE_IS_PRIVATE_RE)
+            extracted["verified"] = _bool_from_match(_PROFILE_VERIFIED_RE)
+            extracted["follower_count"] = _int_from_match(_PROFILE_FOLLOWERS_RE)
+            extracted["following_count"] = _int_from_match(_PROFILE_FOLLOWING_RE)
+            extracted["post_count"] = _int_from_match(_PROFILE_POST_COUNT_RE)
 
         # Fallback via meta description (útil quando o payload principal não vem completo)
         if any(extracted.get(k) is None for k in ("follower_count", "following_count", "post_count", "bio")):
-            meta_match = re.search(
-                r'<meta[^>]+property=["\']og:description["\'][^>]+content=["\']([^"\']+)["\']',
-                text,
-                flags=re.IGNORECASE,
-            )
+            meta_match = _OG_DESCRIPTION_RE.search(text)
             if meta_match:
                 og_desc = html_lib.unescape(meta_match.group(1))
-                nums = [self._to_int_or_none(n) for n in re.findall(r"(\d[\d\.,]*)", og_desc)]
+                nums = [self._to_int_or_none(n) for n in _OG_DESC_NUMBER_RE.findall(og_desc)]
                 nums = [n for n in nums if n is not None]
                 if extracted.get("follower_count") is None and len(nums) >= 1:
                     extracted["follower_count"] = nums[0]
@@ -230,19 +435,15 @@ class InstagramScraper:
                     extracted["post_count"] = nums[2]
 
                 if extracted.get("bio") is None:
-                    bio_desc_match = re.search(r"on Instagram:\s*\"([^\"]+)\"", og_desc, flags=re.IGNORECASE)
+                    bio_desc_match = _OG_DESC_BIO_RE.search(og_desc)
                     if bio_desc_match:
                         extracted["bio"] = bio_desc_match.group(1).strip()
 
         if extracted.get("full_name") is None:
-            og_title_match = re.search(
-                r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\']([^"\']+)["\']',
-                text,
-                flags=re.IGNORECASE,
-            )
+            og_title_match = _OG_TITLE_RE.search(text)
             if og_title_match:
                 og_title = html_lib.unescape(og_title_match.group(1)).strip()
-                full_name = re.sub(r"\s*\(@[^)]+\).*", "", og_title).strip()
+                full_name = _OG_TITLE_HANDLE_RE.sub("", og_title).strip()
                 if full_name and full_name.lower() != "instagram":
                     extracted["full_name"] = full_name
 
@@ -259,33 +460,33 @@ class InstagramScraper:
         primary: List[Dict[str, Any]],
         fallback: List[Dict[str, Any]],
         max_posts: int,
+        primary_already_normalized: bool = False,
     ) -> List[Dict[str, Any]]:
         merged: List[Dict[str, Any]] = []
         by_url: Dict[str, Dict[str, Any]] = {}
 
         def _url_key(url: Optional[str]) -> Optional[str]:
+            # host + path sem barra final; split direto em vez do urlparse completo.
             if not url:
                 return None
-            try:
-                parsed = urlparse(url)
-                return f"{parsed.netloc}{parsed.path}".rstrip("/")
-            except Exception:
-                return url.rstrip("/")
+            key = url.split("://", 1)[-1]
+            key = key.split("?", 1)[0].split("#", 1)[0]
+            return key.rstrip("/")
 
         for src in primary:
-            normalized = self._normalize_post_item(src)
+            if len(merged) >= max_posts:
+                break
+            normalized = src if primary_already_normalized else self._normalize_post_item(src)
             url_key = _url_key(normalized.get("post_url"))
-            if url_key and url_key not in by_url:
-                by_url[url_key] = normalized
-                merged.append(normalized)
-            elif not url_key:
+            # setdefault: um unico acesso ao dict para checar e registrar a URL.
+            if not url_key or by_url.setdefault(url_key, normalized) is normalized:
                 merged.append(normalized)
 
         for src in fallback:
             normalized = self._normalize_post_item(src)
             url_key = _url_key(normalized.get("post_url"))
-            if url_key and url_key in by_url:
-                target = by_url[url_key]
+            target = by_url.get(url_key) if url_key else None
+            if target is not None:
                 if not target.get("caption") and normalized.get("caption"):
                     target["caption"] = normalized["caption"]
                 if target.get("like_count", 0) == 0 and normalized.get("like_count", 0) > 0:
@@ -295,13 +496,50 @@ class InstagramScraper:
                 if not target.get("posted_at") and normalized.get("posted_at"):
                     target["posted_at"] = normalized["posted_at"]
                 continue
-            if url_key and url_key not in by_url:
-                by_url[url_key] = normalized
-            merged.append(normalized)
             if len(merged) >= max_posts:
                 break
+            if url_key:
+                by_url[url_key] = normalized
+            merged.append(normalized)
 
-        return merged[:max_posts]
+        return merged
+
+    async def _render_screenshot_and_html(
+        self,
+        url: str,
+        cookies: Optional[list[dict]] = None,
+        user_agent: Optional[str] = None,
+    ) -> tuple:
+        """
+        Obtem screenshot + HTML da mesma URL, preferindo um unico render via /function.
+        Se o bundle falhar, busca os dois em paralelo. Cada item do retorno e o valor
+        ou a excecao correspondente.
+        """
+        try:
+            bundle = await self.browserless.render_bundle(
+                url,
+                cookies=cookies,
+                user_agent=user_agent,
+            )
+            if bundle.get("screenshot") and bundle.get("html"):
+                return bundle["screenshot"], bundle["html"]
+        except Exception:
+            pass
+        return tuple(
+            await asyncio.gather(
+                self.browserless.screenshot(
+                    url,
+                    cookies=cookies,
+                    user_agent=user_agent,
+                ),
+                self.browserless.get_html(
+                    url,
+                    cookies=cookies,
+                    user_agent=user_agent,
+                ),
+                return_exceptions=True,
+            )
+        )
 
     async def _fallback_scrape_posts_via_browserless(
         self,
@@ -317,82 +555,124 @@ class InstagramScraper:
         - abre cada post diretamente e usa IA para extrair campos.
         """
         try:
+            # O HTML do perfil so e varrido atras de links: busca em bytes, sem decodificar.
             html = profile_html or await self.browserless.get_html(
                 profile_url,
                 cookies=cookies,
                 user_agent=user_agent,
+                return_bytes=True,
             )
             post_urls = self._extract_post_urls_from_html(html, max_posts=max_posts)
             if not post_urls:
                 return []
 
-            recovered: List[Dict[str, Any]] = []
-            for post_url in post_urls[:max_posts]:
-                screenshot_base64: Optional[str] = None
-                post_html: Optional[str] = None
-                try:
-                    screenshot_base64 = await self.browserless.screenshot(
-                        post_url,
-                        cookies=cookies,
-                        user_agent=user_agent,
-                    )
-                except Exception as exc:
-                    logger.warning("⚠️ Falha ao capturar screenshot do post %s: %s", post_url, exc)
-                try:
-                    post_html = await self.browserless.get_html(
+            # Renders dos posts em paralelo, limitados pela concorrencia configurada do Browserless.
+            semaphore = asyncio.Semaphore(max(1, settings.browserless_max_concurrency))
+
+            async def _render_post(post_url: str) -> Optional[Dict[str, Any]]:
+                async with semaphore:
+                    screenshot_result, html_result = await self._render_screenshot_and_html(
                         post_url,
                         cookies=cookies,
                         user_agent=user_agent,
                     )
-                except Exception as exc:
-                    logger.warning("⚠️ Falha ao obter HTML do post %s: %s", post_url, exc)
+                screenshot_base64: Optional[str] = None
+                post_html: Optional[str] = None
+                if isinstance(screenshot_result, BaseException):
+                    logger.warning("⚠️ Falha ao capturar screenshot do post %s: %s", post_url, screenshot_result)
+                else:
+                    screenshot_base64 = screenshot_result
+                if isinstance(html_result, BaseException):
+                    logger.warning("⚠️ Falha ao obter HTML do post %s: %s", post_url, html_result)
+                else:
+                    post_html = html_result
 
-                ai_candidates: List[Dict[str, Any]] = []
-                if screenshot_base64 or post_html:
-                    try:
-                        ai_candidates = await self.ai_extractor.extract_posts_info(
-                            screenshot_base64=screenshot_base64,
-                            html_content=post_html,
-                        )
-                    except Exception as exc:
-                        logger.warning("⚠️ IA não conseguiu extrair o post %s: %s", post_url, exc)
+                if self._looks_blocked(post_html):
+                    logger.warning("⚠️ Post %s retornou pagina de bloqueio; IA ignorada.", post_url)
+                    return None
+                if not screenshot_base64 and not post_html:
+                    return None
+                return {
+                    "post_url": post_url,
+                    "screenshot_base64": screenshot_base64,
+                    "html_content": post_html,
+                }
 
-                selected: Dict[str, Any] = {}
-                for candidate in ai_candidates:
-                    if not isinstance(candidate, dict):
-                        continue
-                    candidate_url = str(candidate.get("post_url") or "").rstrip("/")
-                    if candidate_url and candidate_url == post_url.rstrip("/"):
-                        selected = candidate
-                        break
-                if not selected and ai_candidates:
-                    first_candidate = next((c for c in ai_candidates if isinstance(c, dict)), None)
-                    if first_candidate:
-                        selected = first_candidate
-
-                recovered.append(self._normalize_post_item(selected, fallback_url=post_url))
-
-            return recovered[:max_posts]
+            rendered = await asyncio.gather(*(_render_post(post_url) for post_url in post_urls))
+            extracted = await self._extract_fallback_posts_with_ai([item for item in rendered if item])
+            return [
+                self._normalize_post_item(extracted.get(post_url.rstrip("/")) or {}, fallback_url=post_url)
+                for post_url in post_urls
+            ]
         except Exception as exc:
             logger.warning("⚠️ Fallback via Browserless falhou: %s", exc)
             return []
 
+    async def _extract_fallback_posts_with_ai(
+        self,
+        items: List[Dict[str, Any]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Extrai os posts renderizados com IA em lotes (uma chamada por lote, lotes em paralelo).
+        Se um lote falhar, os posts dele sao extraidos um a um.
+        Retorna post_url (sem barra final) -> dados do post.
+        """
+
+        async def _extract_one(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+            post_url = item["post_url"]
+            try:
+                candidates = await self.ai_extractor.extract_posts_info(
+                    screenshot_base64=item["screenshot_base64"],
+                    html_content=item["html_content"],
+                )
+            except Exception as exc:
+                logger.warning("⚠️ IA não conseguiu extrair o post %s: %s", post_url, exc)
+                return {}
+            candidates = [c for c in candidates if isinstance(c, dict)]
+            target_url = post_url.rstrip("/")
+            selected = next(
+                (c for c in candidates if str(c.get("post_url") or "").rstrip("/") == target_url),
+                candidates[0] if candidates else None,
+            )
+            return {target_url: selected} if selected else {}
+
+        async def _extract_batch(batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            if len(batch) > 1:
+                try:
+                    return await self.ai_extractor.extract_posts_info_batch(batch)
+                except Exception as exc:
+                    logger.warning("⚠️ Extracao em lote falhou; extraindo posts individualmente: %s", exc)
+            results: Dict[str, Dict[str, Any]] = {}
+            for partial in await asyncio.gather(*(_extract_one(item) for item in batch)):
+                results.update(partial)
+            return results
+
+        extracted: Dict[str, Dict[str, Any]] = {}
+        batches = [
+            items[start:start + _AI_POSTS_BATCH_SIZE]
+            for start in range(0, len(items), _AI_POSTS_BATCH_SIZE)
+        ]
+        for partial in await asyncio.gather(*(_extract_batch(batch) for batch in batches)):
+            extracted.update(partial)
+        return extracted
+
     def _recover_posts_from_raw_result(self, raw_result: str) -> List[Dict[str, Any]]:
         """
         Tenta recuperar payload JSON com "posts" mesmo quando o agente retorna texto extra.
         """
-        if not raw_result:
+        # Sem a chave entre aspas nenhum objeto serve; evita varrer transcripts longos a toa.
+        if not raw_result or '"posts"' not in raw_result:
             return []
-        decoder = json.JSONDecoder()
-        for idx, char in enumerate(raw_result):
-            if char != "{":
-                continue
+        # Pula direto entre as "{" e decodifica no offset (sem copiar o restante do texto).
+        idx = raw_result.find("{")
+        while idx != -1:
             try:
-                obj, _ = decoder.raw_decode(raw_result[idx:])
-            except Exception:
-                continue
+                obj, _ = _JSON_DECODER.raw_decode(raw_result, idx)
+            except ValueError:
+                obj = None
             if isinstance(obj, dict) and isinstance(obj.get("posts"), list):
-                return obj.get("posts", [])
+                return obj["posts"]
+            idx = raw_result.find("{", idx + 1)
         return []
 
     def _relative_time_to_hours(self, text: Optional[str]) -> Optional[float]:
@@ -407,40 +687,23 @@ class InstagramScraper:
         if not cleaned:
             return None
 
-        cleaned = cleaned.replace("\u2022", " ").replace("\u00b7", " ")
-        cleaned = re.sub(r"\b(editado|editada|edited)\b", "", cleaned)
-        cleaned = re.sub(r"\bago\b", "", cleaned)
-        cleaned = re.sub(r"\bh[a\u00e1]\b", "", cleaned)
-        cleaned = cleaned.strip()
+        cleaned = _RELATIVE_TIME_NOISE_RE.sub("", cleaned.translate(_RELATIVE_TIME_SEPARATORS)).strip()
 
-        if cleaned in {"now", "just now", "agora", "agora mesmo"}:
+        if cleaned in _NOW_TOKENS:
             return 0.0
-        if cleaned in {"today", "hoje"}:
+        if cleaned in _TODAY_TOKENS:
             return 0.0
-        if cleaned in {"yesterday", "ontem"}:
+        if cleaned in _YESTERDAY_TOKENS:
             return 24.0
 
-        patterns = [
-            (r"(\d+(?:[.,]\d+)?)\s*(?:s|seg|segs|segundo|segundos|sec|secs|second|seconds)\b", 1 / 3600),
-            (r"(\d+(?:[.,]\d+)?)\s*(?:m|min|mins|minute|minutes|minuto|minutos)\b", 1 / 60),
-            (r"(\d+(?:[.,]\d+)?)\s*(?:h|hr|hrs|hour|hours|hora|horas)\b", 1),
-            (r"(\d+(?:[.,]\d+)?)\s*(?:d|day|days|dia|dias)\b", 24),
-            (r"(\d+(?:[.,]\d+)?)\s*(?:w|wk|wks|week|weeks|sem|semana|semanas)\b", 24 * 7),
-            (r"(\d+(?:[.,]\d+)?)\s*(?:mo|month|months|mes|m[e\u00ea]s|meses)\b", 24 * 30),
-            (r"(\d+(?:[.,]\d+)?)\s*(?:y|yr|year|years|ano|anos)\b", 24 * 365),
-        ]
-
-        for pattern, hour_multiplier in patterns:
-            match = re.search(pattern, cleaned)
-            if not match:
-                continue
-            value = match.group(1).replace(",", ".")
-            try:
-                return float(value) * hour_multiplier
-            except ValueError:
-                return None
-
-        return None
+        match = _RELATIVE_TIME_RE.search(cleaned)
+        if not match:
+            return None
+        value = match.group(1).replace(",", ".")
+        try:
+            return float(value) * _RELATIVE_TIME_HOURS[match.lastgroup]
+        except ValueError:
+            return None
 
     def _parse_absolute_date(self, text: str, now: datetime) -> Optional[datetime]:
         """
@@ -457,8 +720,8 @@ class InstagramScraper:
         normalized = unicodedata.normalize("NFD", cleaned)
         normalized = "".join(ch for ch in normalized if unicodedata.category(ch) != "Mn")
         normalized = normalized.replace(",", " ").replace(".", " ")
-        normalized = re.sub(r"\bde\b", " ", normalized)
-        normalized = re.sub(r"\s+", " ", normalized).strip()
+        normalized = _DE_RE.sub(" ", normalized)
+        normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
 
         month_map = {
             "january": 1,
@@ -508,7 +771,7 @@ class InstagramScraper:
             return None
 
         def _parse_day(token: str) -> Optional[int]:
-            match = re.match(r"(\d{1,2})", token)
+            match = _DAY_RE.match(token)
             if not match:
                 return None
             day = int(match.group(1))
@@ -519,7 +782,7 @@ class InstagramScraper:
         def _parse_year(token: Optional[str]) -> Optional[int]:
             if not token:
                 return None
-            match = re.match(r"(\d{2,4})", token)
+            match = _YEAR_RE.match(token)
             if not match:
                 return None
             year = int(match.group(1))
@@ -568,14 +831,20 @@ class InstagramScraper:
 
         return None
 
-    def _is_recent_post(self, posted_at: Any, recent_days: int = 1) -> bool:
+    def _is_recent_post(
+        self,
+        posted_at: Any,
+        recent_days: int = 1,
+        now: Optional[datetime] = None,
+    ) -> bool:
         """
         Determina se o post é recente baseado no texto/valor retornado pelo scraper.
+        `now` (UTC) pode ser informado pelo chamador para usar o mesmo instante em um lote.
         """
         if posted_at is None:
             return False
 
-        now = datetime.now(timezone.utc)
+        now = now or datetime.now(timezone.utc)
         limit_hours = max(1, int(recent_days)) * 24
 
         if isinstance(posted_at, datetime):
@@ -586,24 +855,25 @@ class InstagramScraper:
         if not text:
             return False
 
-        if text in {"now", "just now", "agora", "agora mesmo"}:
+        if text in _NOW_TOKENS:
             return True
 
-        iso_candidate = text.replace("z", "+00:00")
-        try:
-            parsed = datetime.fromisoformat(iso_candidate)
-            parsed = parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
-            return (now - parsed).total_seconds() <= limit_hours * 3600
-        except Exception:
-            pass
+        # So tenta ISO quando o texto comeca com o ano; "2h"/"3d" nao pagam o try/except.
+        if text[:4].isdigit():
+            try:
+                parsed = datetime.fromisoformat(text.replace("z", "+00:00"))
+                parsed = parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+                return (now - parsed).total_seconds() <= limit_hours * 3600
+            except ValueError:
+                pass
 
         absolute_dt = self._parse_absolute_date(text, now)
         if absolute_dt is not None:
             return (now - absolute_dt).total_seconds() <= limit_hours * 3600
 
-        if text in {"today", "hoje"}:
+        if text in _TODAY_TOKENS:
             return True
-        if text in {"yesterday", "ontem"}:
+        if text in _YESTERDAY_TOKENS:
             return limit_hours >= 48
 
         hours = self._relative_time_to_hours(text)
@@ -644,16 +914,21 @@ class InstagramScraper:
         """
         username = self._extract_username_from_url(user_url)
         try:
-            screenshot = await self.browserless.screenshot(
-                user_url,
-                cookies=cookies,
-                user_agent=user_agent,
-            )
-            html = await self.browserless.get_html(
+            screenshot, html = await self._render_screenshot_and_html(
                 user_url,
                 cookies=cookies,
                 user_agent=user_agent,
             )
+            for result in (screenshot, html):
+                if isinstance(result, BaseException):
+                    raise result
+            if self._looks_blocked(html):
+                logger.warning("⚠️ Perfil curtidor %s retornou pagina de bloqueio.", user_url)
+                return {
+                    "user_url": user_url,
+                    "user_username": username,
+                    "error": "blocked",
+                }
             extracted = await self.ai_extractor.extract_user_info(
                 screenshot_base64=screenshot,
                 html_content=html,
@@ -686,6 +961,29 @@ class InstagramScraper:
         """
         Raspa um perfil completo do Instagram.
         """
+        # UA sorteado vale so para este scrape; o reset evita vazar para o contexto do chamador.
+        ua_token = _scrape_user_agent.set(None)
+        try:
+            # Todas as chamadas REST ao Browserless deste scrape compartilham a sessao (quando habilitada).
+            async with self.browserless.session():
+                return await self._scrape_profile_in_session(
+                    profile_url=profile_url,
+                    max_posts=max_posts,
+                    db=db,
+                    session_username=session_username,
+                )
+        finally:
+            _scrape_user_agent.reset(ua_token)
+
+    async def _scrape_profile_in_session(
+        self,
+        profile_url: str,
+        max_posts: int,
+        db: Optional[Session],
+        session_username: Optional[str],
+    ) -> Dict[str, Any]:
+        # Um unico timestamp por scrape (resumo e persistencia do perfil).
+        now = datetime.now(timezone.utc)
         try:
             logger.info("Iniciando scraping completo do perfil: %s", profile_url)
 
@@ -708,7 +1006,7 @@ class InstagramScraper:
                     f"Sessao Instagram '@{session_username}' nao encontrada ou invalida."
                 )
             cookies = browser_use_agent.get_cookies(storage_state)
-            user_agent = browser_use_agent.get_user_agent(storage_state)
+            user_agent = self._resolve_user_agent(storage_state)
 
             profile_result = await self.scrape_profile_info(
                 profile_url=profile_url,
@@ -718,31 +1016,56 @@ class InstagramScraper:
                 session_username=session_username,
             )
 
-            posts_data = await self._scrape_posts(
-                profile_url=profile_url,
-                max_posts=max_posts,
-                cookies=cookies,
-                storage_state=storage_state,
-                user_agent=user_agent,
-            )
-
+            posts_data: List[Dict[str, Any]] = []
             all_interactions: List[Dict[str, Any]] = []
-            for post_data in posts_data:
-                post_url = post_data.get("post_url")
-                if not post_url:
-                    continue
-                interactions = await self._scrape_post_interactions(
-                    post_url=post_url,
-                    post_data=post_data,
+            if settings.skip_private_posts and profile_result.get("is_private"):
+                # Perfil privado: posts e interacoes nao ficam visiveis, evita renders e chamadas de IA.
+                logger.info("Perfil privado, pulando posts e interacoes: %s", profile_url)
+            else:
+                posts_data = await self._scrape_posts(
+                    profile_url=profile_url,
+                    max_posts=max_posts,
+                    cookies=cookies,
                     storage_state=storage_state,
+                    user_agent=user_agent,
                 )
-                for interaction in interactions:
-                    interaction["_post_url"] = post_url
-                all_interactions.extend(interactions)
+
+                # Interacoes de posts diferentes sao independentes: roda em paralelo, limitado
+                # por interaction_concurrency (cada post ja espera um atraso aleatorio antes
+                # de abrir, o que espalha as requisicoes ao Instagram).
+                interactions_semaphore = asyncio.Semaphore(max(1, settings.interaction_concurrency))
+
+                async def _collect_interactions(post_url: str, post_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+                    async with interactions_semaphore:
+                        interactions = await self._scrape_post_interactions(
+                            post_url=post_url,
+                            post_data=post_data,
+                            storage_state=storage_state,
+                        )
+                    for interaction in interactions:
+                        interaction["_post_url"] = post_url
+                    return interactions
+
+                interaction_batches = await asyncio.gather(
+                    *(
+                        _collect_interactions(post_data["post_url"], post_data)
+                        for post_data in posts_data
+                        if post_data.get("post_url")
+                    )
+                )
+                all_interactions = [
+                    interaction for batch in interaction_batches for interaction in batch
+                ]
 
             if db:
-                profile_db = await self._save_profile(db, profile_url, profile_result)
-                await self._save_posts_and_interactions(db, profile_db.id, posts_data, all_interactions)
+                await self._save_scrape_result(
+                    db,
+                    profile_url,
+                    profile_result,
+                    posts_data,
+                    all_interactions,
+                    scraped_at=now.replace(tzinfo=None),
+                )
 
             return {
                 "status": "success",
@@ -761,7 +1084,7 @@ class InstagramScraper:
                 "summary": {
                     "total_posts": len(posts_data),
                     "total_interactions": len(all_interactions),
-                    "scraped_at": datetime.utcnow().isoformat(),
+                    "scraped_at": now.isoformat(),
                 },
             }
         except Exception as e:
@@ -780,6 +1103,7 @@ class InstagramScraper:
         Raspa somente os dados do perfil (sem posts/interacoes).
         Reutiliza sessao autenticada do Instagram quando disponivel.
         """
+        ua_token = _scrape_user_agent.set(None)
         try:
             if not profile_url.startswith("http"):
                 profile_url = f"https://instagram.com/{profile_url}"
@@ -789,7 +1113,7 @@ class InstagramScraper:
             username_fallback = self._extract_username_from_url(profile_url).strip().lstrip("@").lower()
 
             if db and cache_ttl_days > 0:
-                ttl_cutoff = datetime.utcnow() - timedelta(days=cache_ttl_days)
+                ttl_cutoff = _utcnow_naive() - timedelta(days=cache_ttl_days)
                 cached = db.query(Profile).filter(
                     (Profile.instagram_url == profile_url)
                     | (func.lower(Profile.instagram_username) == username_fallback)
@@ -813,7 +1137,7 @@ class InstagramScraper:
                         "confidence": 1.0,
                         "profile_id": cached.id,
                         "last_scraped_at": cached.last_scraped_at,
-                        "extracted_at": datetime.utcnow(),
+                        "extracted_at": datetime.now(timezone.utc),
                     }
 
             storage_state = (
@@ -829,7 +1153,7 @@ class InstagramScraper:
                     f"Sessao Instagram '@{session_username}' nao encontrada ou invalida."
                 )
             cookies = browser_use_agent.get_cookies(storage_state)
-            user_agent = browser_use_agent.get_user_agent(storage_state)
+            user_agent = self._resolve_user_agent(storage_state)
 
             profile_info: Dict[str, Any] = {}
             browser_use_result: Dict[str, Any] = {}
@@ -874,6 +1198,10 @@ class InstagramScraper:
                 profile_info.get(key) is not None
                 for key in ("bio", "follower_count", "following_count", "post_count")
             )
+            if still_poor and self._looks_blocked(profile_html):
+                raise RuntimeError(
+                    f"Pagina de bloqueio retornada para {profile_url}; extracao por IA ignorada."
+                )
             if still_poor:
                 try:
                     profile_screenshot = await self.browserless.screenshot(
@@ -919,7 +1247,7 @@ class InstagramScraper:
                 "post_count": self._to_int_or_none(profile_info.get("post_count")),
                 "verified": bool(profile_info.get("verified", False)),
                 "confidence": profile_info.get("confidence"),
-                "extracted_at": datetime.utcnow(),
+                "extracted_at": datetime.now(timezone.utc),
             }
 
             if db and save_to_db:
@@ -934,6 +1262,8 @@ class InstagramScraper:
         except Exception as e:
             logger.exception("Erro ao extrair dados do perfil %s: %s", profile_url, e)
             raise
+        finally:
+            _scrape_user_agent.reset(ua_token)
 
     async def scrape_recent_posts_like_users(
         self,
@@ -951,6 +1281,7 @@ class InstagramScraper:
         2) para posts dentro da janela recente, coleta usuários que curtiram;
         3) opcionalmente enriquece os perfis curtidores com IA.
         """
+        ua_token = _scrape_user_agent.set(None)
         try:
             logger.info("🚀 Iniciando fluxo recent_likes para %s", profile_url)
             if collect_like_user_profiles:
@@ -975,7 +1306,7 @@ class InstagramScraper:
                     f"Sessao Instagram '@{session_username}' nao encontrada ou invalida."
                 )
             cookies = browser_use_agent.get_cookies(storage_state)
-            user_agent = browser_use_agent.get_user_agent(storage_state)
+            user_agent = self._resolve_user_agent(storage_state)
 
             posts_data = await self._scrape_posts(
                 profile_url=profile_url,
@@ -985,20 +1316,17 @@ class InstagramScraper:
                 user_agent=user_agent,
             )
 
-            extracted_posts: List[Dict[str, Any]] = []
-            total_like_users = 0
-            total_recent_posts = 0
-            all_interactions: List[Dict[str, Any]] = []
-
-            for post in posts_data[:max_posts]:
-                post_url = post.get("post_url")
-                if not post_url:
-                    continue
+            # Posts recentes sao independentes (curtidores + comentarios): processa em
+            # paralelo, limitado por interaction_concurrency.
+            posts_semaphore = asyncio.Semaphore(max(1, settings.interaction_concurrency))
+            # Mesmo instante de referencia para a janela "recente" de todos os posts.
+            now = datetime.now(timezone.utc)
 
+            async def _process_post(post: Dict[str, Any]) -> tuple:
+                post_url = post["post_url"]
                 posted_at = post.get("posted_at")
-                is_recent = self._is_recent_post(posted_at, recent_days=recent_days)
-                if is_recent:
-                    total_recent_posts += 1
+                is_recent = self._is_recent_post(posted_at, recent_days=recent_days, now=now)
+                post_interactions: List[Dict[str, Any]] = []
 
                 post_payload: Dict[str, Any] = {
                     "post_url": post_url,
@@ -1015,37 +1343,35 @@ class InstagramScraper:
 
                 if not is_recent:
                     post_payload["error"] = "post_older_than_window"
-                    extracted_posts.append(post_payload)
-                    continue
+                    return post_payload, post_interactions
 
-                like_users_result = await browser_use_agent.scrape_post_like_users(
-                    post_url=post_url,
-                    storage_state=storage_state,
-                    max_users=max_like_users_per_post,
-                )
+                async with posts_semaphore:
+                    like_users_result = await browser_use_agent.scrape_post_like_users(
+                        post_url=post_url,
+                        storage_state=storage_state,
+                        max_users=max_like_users_per_post,
+                    )
 
-                post_payload["likes_accessible"] = bool(like_users_result.get("likes_accessible"))
-                post_payload["error"] = like_users_result.get("error")
-
-                like_users = like_users_result.get("like_users") or []
-                if isinstance(like_users, list):
-                    dedup_users = []
-                    for item in like_users:
-                        if isinstance(item, str) and item not in dedup_users:
-                            dedup_users.append(item)
-                    post_payload["like_users"] = dedup_users
-                    for user_url in post_payload["like_users"]:
-                        all_interactions.append({
-                            "type": "like",
-                            "user_url": user_url,
-                            "user_username": self._extract_username_from_url(user_url),
-                            "_post_url": post_url,
-                        })
-                else:
-                    post_payload["like_users"] = []
+                    post_payload["likes_accessible"] = bool(like_users_result.get("likes_accessible"))
+                    post_payload["error"] = like_users_result.get("error")
+
+                    like_users = like_users_result.get("like_users") or []
+                    if isinstance(like_users, list):
+                        dedup_users = []
+                        for item in like_users:
+                            if isinstance(item, str) and item not in dedup_users:
+                                dedup_users.append(item)
+                        post_payload["like_users"] = dedup_users
+                        for user_url in post_payload["like_users"]:
+                            post_interactions.append({
+                                "type": "like",
+                                "user_url": user_url,
+                                "user_username": self._extract_username_from_url(user_url),
+                                "_post_url": post_url,
+                            })
+                    else:
+                        post_payload["like_users"] = []
 
-                total_like_users += len(post_payload["like_users"])
-                if is_recent:
                     try:
                         comment_interactions = await self._scrape_post_interactions(
                             post_url=post_url,
@@ -1059,14 +1385,28 @@ class InstagramScraper:
                         ]
                         for interaction in comment_interactions:
                             interaction["_post_url"] = post_url
-                        all_interactions.extend(comment_interactions)
+                        post_interactions.extend(comment_interactions)
                     except Exception as exc:
                         logger.warning("Falha ao extrair comentarios do post %s: %s", post_url, exc)
 
                 # Enriquecimento de perfis curtidores foi removido do /scrape.
                 # Mantemos like_users_data vazio por compatibilidade de contrato.
+                return post_payload, post_interactions
+
+            processed = await asyncio.gather(
+                *(_process_post(post) for post in posts_data[:max_posts] if post.get("post_url"))
+            )
 
+            extracted_posts: List[Dict[str, Any]] = []
+            all_interactions: List[Dict[str, Any]] = []
+            total_like_users = 0
+            total_recent_posts = 0
+            for post_payload, post_interactions in processed:
                 extracted_posts.append(post_payload)
+                all_interactions.extend(post_interactions)
+                if post_payload["is_recent"]:
+                    total_recent_posts += 1
+                total_like_users += len(post_payload["like_users"])
 
             result = {
                 "status": "success",
@@ -1080,7 +1420,7 @@ class InstagramScraper:
                     "total_posts": len(extracted_posts),
                     "recent_posts": total_recent_posts,
                     "total_like_users": total_like_users,
-                    "scraped_at": datetime.utcnow().isoformat(),
+                    "scraped_at": now.isoformat(),
                 },
             }
 
@@ -1092,8 +1432,7 @@ class InstagramScraper:
                     "follower_count": None,
                     "verified": False,
                 }
-                profile_db = await self._save_profile(db, profile_url, profile_payload)
-                await self._save_posts_and_interactions(db, profile_db.id, extracted_posts, all_interactions)
+                await self._save_scrape_result(db, profile_url, profile_payload, extracted_posts, all_interactions)
 
             logger.info(
                 "✅ Fluxo recent_likes concluído: posts=%s recentes=%s curtidores=%s",
@@ -1105,6 +1444,8 @@ class InstagramScraper:
         except Exception as exc:
             logger.exception("❌ Erro no fluxo recent_likes para %s: %s", profile_url, exc)
             raise
+        finally:
+            _scrape_user_agent.reset(ua_token)
 
     async def _scrape_posts(
         self,
@@ -1129,7 +1470,7 @@ class InstagramScraper:
             Lista de posts extraídos
         """
         try:
-            logger.info(f"🤖 Usando Browser Use para raspar {max_posts} posts...")
+            logger.info("🤖 Usando Browser Use para raspar %s posts...", max_posts)
 
             # Usar Browser Use Agent para navegar e extrair posts
             result = await browser_use_agent.scrape_profile_posts(
@@ -1141,11 +1482,11 @@ class InstagramScraper:
             posts_data = result.get("posts", [])
 
             if result.get("error"):
-                logger.warning(f"⚠️ Browser Use retornou erro: {result['error']}")
+                logger.warning("⚠️ Browser Use retornou erro: %s", result["error"])
                 if result["error"] == "private_profile":
                     logger.info("🔒 Perfil privado detectado")
                 elif result["error"] == "parse_failed":
-                    logger.warning(f"⚠️ Falha ao parsear resposta: {result.get('raw_result', '')[:200]}")
+                    logger.warning("⚠️ Falha ao parsear resposta: %s", result.get("raw_result", "")[:200])
                     recovered = self._recover_posts_from_raw_result(result.get("raw_result", ""))
                     if recovered:
                         logger.info("✅ Recuperados %s posts do raw_result.", len(recovered))
@@ -1172,11 +1513,16 @@ class InstagramScraper:
                 )
                 if fallback_posts:
                     logger.info("✅ Fallback recuperou %s posts.", len(fallback_posts))
-                posts_data = self._merge_posts_data(normalized_primary, fallback_posts, max_posts=max_posts)
+                posts_data = self._merge_posts_data(
+                    normalized_primary,
+                    fallback_posts,
+                    max_posts=max_posts,
+                    primary_already_normalized=True,
+                )
             else:
                 posts_data = normalized_primary
 
-            logger.info(f"✅ {len(posts_data)} posts extraídos via Browser Use")
+            logger.info("✅ %s posts extraídos via Browser Use", len(posts_data))
             return posts_data[:max_posts]
 
         except Exception as e:
@@ -1299,22 +1645,44 @@ class InstagramScraper:
                     "count": post_data.get("like_count"),
                 })
 
-            logger.info(f"✅ {len(interactions)} interações extraídas do post")
+            logger.info("✅ %s interações extraídas do post", len(interactions))
             return interactions
 
         except Exception as e:
-            logger.error(f"❌ Erro ao raspar interações do post: {e}")
+            logger.error("❌ Erro ao raspar interações do post: %s", e)
             return []
 
+    def _is_postgres(self, db: Session) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+
     async def _save_profile(
         self,
         db: Session,
         profile_url: str,
         profile_info: Dict[str, Any],
+        scraped_at: Optional[datetime] = None,
     ) -> Profile:
         """
         Salva informacoes do perfil no banco de dados.
+
+        A Session e sincrona: o trabalho roda numa thread para nao travar o event loop
+        (e as chamadas ao Browserless em andamento) durante queries e commit.
+        """
+        return await asyncio.to_thread(self._save_profile_sync, db, profile_url, profile_info, scraped_at)
+
+    def _save_profile_sync(
+        self,
+        db: Session,
+        profile_url: str,
+        profile_info: Dict[str, Any],
+        scraped_at: Optional[datetime] = None,
+        commit: bool = True,
+    ) -> Profile:
+        """
+        Com commit=False apenas grava na transacao corrente (flush) para o chamador
+        concluir junto com posts e interacoes.
         """
+        scraped_at = scraped_at or _utcnow_naive()
         try:
             username = profile_info.get("username") or self._extract_username_from_url(profile_url)
             if not username:
@@ -1325,13 +1693,40 @@ class InstagramScraper:
             if not normalized_profile_url.endswith("/"):
                 normalized_profile_url = f"{normalized_profile_url}/"
 
-            existing = db.query(Profile).filter(
-                (func.lower(Profile.instagram_username) == username)
-                | (Profile.instagram_url == normalized_profile_url)
-            ).first()
-
             full_name = profile_info.get("full_name")
 
+            if self._is_postgres(db):
+                # Upsert atomico pelo username: um round-trip e sem corrida entre scrapes paralelos.
+                values = {
+                    "instagram_username": username,
+                    "instagram_url": normalized_profile_url,
+                    "full_name": full_name,
+                    "bio": profile_info.get("bio"),
+                    "is_private": profile_info.get("is_private", False),
+                    "follower_count": profile_info.get("follower_count"),
+                    "following_count": profile_info.get("following_count"),
+                    "post_count": profile_info.get("post_count"),
+                    "verified": profile_info.get("verified", False),
+                    "last_scraped_at": scraped_at,
+                }
+                stmt = pg_insert(Profile).values(id=str(uuid.uuid4()), **values)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Profile.instagram_username],
+                    set_={
+                        **{key: stmt.excluded[key] for key in values if key != "instagram_username"},
+                        "updated_at": scraped_at,
+                    },
+                ).returning(Profile)
+                profile = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+                if commit:
+                    db.commit()
+                logger.info("Perfil salvo (upsert): %s", username)
+                return profile
+
+            # Mesma chave do upsert do Postgres (username normalizado), para os dois
+            # dialetos deduplicarem perfis do mesmo jeito.
+            existing = db.query(Profile).filter(Profile.instagram_username == username).first()
+
             if existing:
                 existing.instagram_username = username
                 existing.instagram_url = normalized_profile_url
@@ -1342,8 +1737,11 @@ class InstagramScraper:
                 existing.following_count = profile_info.get("following_count")
                 existing.post_count = profile_info.get("post_count")
                 existing.verified = profile_info.get("verified", False)
-                existing.last_scraped_at = datetime.utcnow()
-                db.commit()
+                existing.last_scraped_at = scraped_at
+                if commit:
+                    db.commit()
+                else:
+                    db.flush()
                 logger.info("Perfil atualizado: %s", username)
                 return existing
 
@@ -1357,11 +1755,13 @@ class InstagramScraper:
                 following_count=profile_info.get("following_count"),
                 post_count=profile_info.get("post_count"),
                 verified=profile_info.get("verified", False),
-                last_scraped_at=datetime.utcnow(),
+                last_scraped_at=scraped_at,
             )
             db.add(profile)
-            db.commit()
-            db.refresh(profile)
+            if commit:
+                db.commit()
+            else:
+                db.flush()
             logger.info("Novo perfil salvo: %s", username)
             return profile
 
@@ -1370,12 +1770,47 @@ class InstagramScraper:
             db.rollback()
             raise
 
-    async def _save_posts_and_interactions(
+    async def _save_scrape_result(
         self,
         db: Session,
-        profile_id: str,
+        profile_url: str,
+        profile_info: Dict[str, Any],
         posts_data: List[Dict[str, Any]],
         interactions: List[Dict[str, Any]],
+        scraped_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Salva perfil, posts e interacoes numa unica transacao (um commit), numa thread.
+        """
+        await asyncio.to_thread(
+            self._save_scrape_result_sync,
+            db,
+            profile_url,
+            profile_info,
+            posts_data,
+            interactions,
+            scraped_at,
+        )
+
+    def _save_scrape_result_sync(
+        self,
+        db: Session,
+        profile_url: str,
+        profile_info: Dict[str, Any],
+        posts_data: List[Dict[str, Any]],
+        interactions: List[Dict[str, Any]],
+        scraped_at: Optional[datetime] = None,
+    ) -> None:
+        profile = self._save_profile_sync(db, profile_url, profile_info, scraped_at, commit=False)
+        # O commit (ou rollback, em erro) de posts e interacoes inclui o perfil.
+        self._save_posts_and_interactions_sync(db, profile.id, posts_data, interactions)
+
+    def _save_posts_and_interactions_sync(
+        self,
+        db: Session,
+        profile_id: str,
+        posts_data: List[Dict[str, Any]],
+        interactions: Iterable[Dict[str, Any]],
     ) -> None:
         """
         Salva posts e interações no banco de dados.
@@ -1384,91 +1819,156 @@ class InstagramScraper:
             db: Sessão do banco
             profile_id: ID do perfil
             posts_data: Lista de posts
-            interactions: Lista de interações
+            interactions: Interações (percorridas uma única vez)
         """
         try:
-            for post_data in posts_data:
-                post_url = post_data.get("post_url")
+            post_urls = [url for url in dict.fromkeys(p.get("post_url") for p in posts_data) if url]
 
-                # Verificar se post já existe
-                existing_post = db.query(Post).filter(
-                    Post.post_url == post_url
-                ).first()
+            # Uma unica consulta IN resolve os posts ja existentes.
+            post_ids: Dict[str, str] = {}
+            if post_urls:
+                post_ids = dict(db.execute(_POST_IDS_BY_URL, {"post_urls": post_urls}).all())
 
-                if not existing_post:
-                    post = Post(
-                        profile_id=profile_id,
-                        post_url=post_url,
-                        caption=post_data.get("caption"),
-                        like_count=post_data.get("like_count", 0),
-                        comment_count=post_data.get("comment_count", 0),
-                        posted_at=self._coerce_posted_at_datetime(post_data.get("posted_at")),
+            is_postgres = self._is_postgres(db)
+            new_posts: List[Dict[str, Any]] = []
+            post_rows: List[tuple] = []
+            for post_data in posts_data:
+                post_url = post_data.get("post_url")
+                post_id = post_ids.get(post_url) if post_url else None
+                if post_id is None:
+                    # Id gerado no cliente: dispensa o flush por post para obter a PK.
+                    post_id = str(uuid.uuid4())
+                    new_posts.append(
+                        {
+                            "id": post_id,
+                            "profile_id": profile_id,
+                            "post_url": post_url,
+                            "caption": post_data.get("caption"),
+                            "like_count": post_data.get("like_count", 0),
+                            "comment_count": post_data.get("comment_count", 0),
+                            "posted_at": self._coerce_posted_at_datetime(post_data.get("posted_at")),
+                        }
                     )
-                    db.add(post)
-                    db.flush()
-                    post_id = post.id
+                    if post_url:
+                        post_ids[post_url] = post_id
+                post_rows.append((post_url, post_id))
+
+            if new_posts and is_postgres:
+                # ON CONFLICT DO NOTHING cobre a corrida com outro scrape gravando o mesmo post;
+                # os posts que ele inseriu primeiro tem o id relido do banco.
+                inserted_urls = set(db.scalars(_PG_POST_INSERT, new_posts).all())
+                raced_urls = [row["post_url"] for row in new_posts if row["post_url"] and row["post_url"] not in inserted_urls]
+                if raced_urls:
+                    post_ids.update(db.execute(_POST_IDS_BY_URL, {"post_urls": raced_urls}).all())
+                    post_rows = [
+                        (post_url, post_ids.get(post_url, post_id) if post_url else post_id)
+                        for post_url, post_id in post_rows
+                    ]
+            elif new_posts:
+                db.execute(_POST_INSERT, new_posts)
+
+            # Agrupa as interacoes pelo post de origem uma unica vez: cada post percorre
+            # so o proprio grupo (O(P+C)) em vez da lista inteira. Interacoes sem
+            # _post_url continuam valendo para todos os posts. Tipo e user_url sao
+            # resolvidos aqui, uma vez por interacao, fora do loop por post.
+            interactions_by_post_url: Dict[str, List[tuple]] = {}
+            unbound_interactions: List[tuple] = []
+            for interaction_data in interactions:
+                interaction_type_raw = interaction_data.get("type")
+                if isinstance(interaction_type_raw, InteractionType):
+                    interaction_type = interaction_type_raw
                 else:
-                    post_id = existing_post.id
-
-                # Salvar interações do post
-                for interaction_data in interactions:
-                    interaction_post_url = interaction_data.get("_post_url") or post_url
-                    if not interaction_post_url:
-                        continue
-                    if interaction_post_url != post_url:
+                    try:
+                        interaction_type = InteractionType(str(interaction_type_raw).strip().lower())
+                    except Exception:
                         continue
 
-                    interaction_type_raw = interaction_data.get("type")
-                    if isinstance(interaction_type_raw, InteractionType):
-                        interaction_type = interaction_type_raw
-                    else:
-                        try:
-                            interaction_type = InteractionType(str(interaction_type_raw).strip().lower())
-                        except Exception:
-                            continue
+                user_url = str(interaction_data.get("user_url") or "").strip()
+                if not user_url:
+                    continue
 
-                    user_url = str(interaction_data.get("user_url") or "").strip()
-                    if not user_url:
-                        continue
+                parsed = (user_url, interaction_type, interaction_data)
+                bound_post_url = interaction_data.get("_post_url")
+                if bound_post_url:
+                    interactions_by_post_url.setdefault(bound_post_url, []).append(parsed)
+                else:
+                    unbound_interactions.append(parsed)
 
-                    user_username = str(
-                        interaction_data.get("user_username")
-                        or self._extract_username_from_url(user_url)
-                        or user_url
-                    ).strip()
-
-                    existing_interaction = (
-                        db.query(Interaction)
-                        .filter(Interaction.user_url == user_url)
-                        .filter(Interaction.interaction_type == interaction_type)
-                        .filter(
-                            or_(
-                                Interaction.post_url == interaction_post_url,
-                                (Interaction.post_url.is_(None)) & (Interaction.post_id == post_id),
-                            )
-                        )
-                        .first()
-                    )
+            # Interacoes candidatas, na ordem post -> interacoes.
+            candidates: List[tuple] = []
+            for post_url, post_id in post_rows:
+                if not post_url:
+                    continue
+                post_interactions = interactions_by_post_url.get(post_url, [])
+                if unbound_interactions:
+                    post_interactions = post_interactions + unbound_interactions
+                for user_url, interaction_type, interaction_data in post_interactions:
+                    interaction_post_url = post_url
+                    candidates.append((post_id, interaction_post_url, user_url, interaction_type, interaction_data))
+
+            # Dedup em lote: uma consulta IN no lugar de um SELECT por interacao.
+            seen_by_post_url: set = set()
+            seen_by_post_id: set = set()
+            if candidates:
+                user_urls = list({candidate[2] for candidate in candidates})
+                candidate_post_urls = list({candidate[1] for candidate in candidates})
+                candidate_post_ids = list({candidate[0] for candidate in candidates})
+                existing_rows = db.execute(
+                    _EXISTING_INTERACTIONS,
+                    {
+                        "user_urls": user_urls,
+                        "post_urls": candidate_post_urls,
+                        "post_ids": candidate_post_ids,
+                    },
+                ).all()
+                for row_post_id, row_post_url, row_user_url, row_type in existing_rows:
+                    if row_post_url is not None:
+                        seen_by_post_url.add((row_post_url, row_user_url, row_type))
+                    else:
+                        seen_by_post_id.add((row_post_id, row_user_url, row_type))
 
-                    if not existing_interaction:
-                        interaction = Interaction(
-                            post_id=post_id,
-                            profile_id=profile_id,
-                            post_url=interaction_post_url,
-                            user_username=user_username,
-                            user_url=user_url,
-                            interaction_type=interaction_type,
-                            comment_text=(interaction_data.get("comment_text") if interaction_type == InteractionType.COMMENT else None),
-                            comment_likes=(interaction_data.get("comment_likes", 0) if interaction_type == InteractionType.COMMENT else None),
-                            comment_replies=(interaction_data.get("comment_replies", 0) if interaction_type == InteractionType.COMMENT else None),
-                            comment_posted_at=(interaction_data.get("comment_posted_at") if interaction_type == InteractionType.COMMENT else None),
-                        )
-                        db.add(interaction)
+            comment_type = InteractionType.COMMENT
+            new_interactions: List[Dict[str, Any]] = []
+            for post_id, interaction_post_url, user_url, interaction_type, interaction_data in candidates:
+                url_key = (interaction_post_url, user_url, interaction_type)
+                if url_key in seen_by_post_url or (post_id, user_url, interaction_type) in seen_by_post_id:
+                    continue
+                seen_by_post_url.add(url_key)
+
+                user_username = str(
+                    interaction_data.get("user_username")
+                    or self._extract_username_from_url(user_url)
+                    or user_url
+                ).strip()
+                is_comment = interaction_type is comment_type
+                new_interactions.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "post_id": post_id,
+                        "profile_id": profile_id,
+                        "post_url": interaction_post_url,
+                        "user_username": user_username,
+                        "user_url": user_url,
+                        "interaction_type": interaction_type,
+                        "comment_text": (interaction_data.get("comment_text") if is_comment else None),
+                        "comment_likes": (interaction_data.get("comment_likes", 0) if is_comment else None),
+                        "comment_replies": (interaction_data.get("comment_replies", 0) if is_comment else None),
+                        "comment_posted_at": (interaction_data.get("comment_posted_at") if is_comment else None),
+                    }
+                )
+
+            if new_interactions:
+                # No Postgres o unique (post_url, user_url, interaction_type) descarta duplicatas concorrentes.
+                # Insert Core direto na tabela: as linhas nao voltam a ser lidas nesta sessao.
+                interaction_insert = _PG_INTERACTION_INSERT if is_postgres else _INTERACTION_INSERT
+                # Lotes de tamanho fixo limitam o tamanho de cada executemany em perfis grandes.
+                for start in range(0, len(new_interactions), _DB_INSERT_BATCH_SIZE):
+                    db.execute(interaction_insert, new_interactions[start:start + _DB_INSERT_BATCH_SIZE])
             db.commit()
-            logger.info(f"✅ Posts e interações salvos no banco")
+            logger.info("✅ Posts e interações salvos no banco")
 
         except Exception as e:
-            logger.error(f"❌ Erro ao salvar posts e interações: {e}")
+            logger.error("❌ Erro ao salvar posts e interações: %s", e)
             db.rollback()
             raise
 
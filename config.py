@@ -33,9 +33,19 @@ class Settings(BaseSettings):
     browserless_max_concurrency: int = 2
     browserless_request_retries: int = 3
     browserless_retry_backoff_seconds: float = 1.0
+    browserless_rps: float = 2.0  # 0 desativa o limitador de requisicoes
+    browserless_render_cache_ttl_seconds: float = 60.0  # 0 desativa o cache de screenshot/HTML
+    browserless_rest_session_enabled: bool = False  # reutiliza uma sessao Browserless nas chamadas REST
     browser_use_max_retries: int = 3
     browser_use_retry_backoff: int = 2
+    browser_use_export_timeout_seconds: float = 15.0
+    browser_use_agent_timeout_seconds: float = 600.0
+    browser_use_session_pool_size: int = 2  # 0 desativa o reuso de BrowserSession
+    browser_use_session_pool_idle_seconds: float = 30.0  # descarta BrowserSession ociosa ha mais tempo
+    browser_use_cdp_url_ttl_seconds: float = 30.0
+    browser_use_result_cache_ttl_seconds: float = 60.0  # 0 desativa o cache de resultados
     browser_use_ws_compression: str = "auto"  # auto | none | deflate
+    interaction_concurrency: int = 2  # posts com interacoes raspadas em paralelo
 
     # OpenAI
     openai_api_key: str
@@ -67,6 +77,7 @@ class Settings(BaseSettings):
     api_auth_header_name: str = "X-API-Key"
     api_auth_public_paths: str = "/api/health,/docs,/openapi.json"
     profile_cache_ttl_days: int = 2
+    skip_private_posts: bool = True  # perfis privados nao raspam posts/interacoes
 
     class Config:
         env_file = ".env"
@@ -16,6 +16,7 @@ from app.database import init_db, health_check
 from app.api.routes import router
 from app.api.auth import require_private_api_key
 from app.scraper.instagram_scraper import instagram_scraper
+from app.scraper.browser_use_agent import browser_use_agent
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +47,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("🛑 Encerrando aplicação...")
     await instagram_scraper.close()
+    await browser_use_agent.close()
     logger.info("✅ Aplicação encerrada")
 
 
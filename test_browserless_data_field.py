@@ -0,0 +1,19 @@
+import unittest
+
+from app.scraper.browserless_client import _scan_base64_data_field
+
+
+class ScanBase64DataFieldTest(unittest.TestCase):
+    def test_data_key_is_extracted(self):
+        self.assertEqual(_scan_base64_data_field(b'{"data" : "QUJD+/=="}'), "QUJD+/==")
+
+    def test_data_as_value_falls_back_to_json_parser(self):
+        content = b'{"type":"data","note":"QUJD","data":"REAL"}'
+        self.assertIsNone(_scan_base64_data_field(content))
+
+    def test_escaped_slash_falls_back_to_json_parser(self):
+        self.assertIsNone(_scan_base64_data_field(b'{"data":"QU\\/JD"}'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from app.scraper import browserless_client as bc
+
+
+class CoalesceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = bc.BrowserlessClient()
+
+    async def test_concurrent_callers_share_one_fetch(self):
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return "html"
+
+        waiters = [asyncio.ensure_future(self.client._coalesce(("k",), fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await asyncio.gather(*waiters), ["html"] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.client._inflight, {})
+
+    async def test_exception_reaches_every_waiter(self):
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            raise RuntimeError("boom")
+
+        waiters = [asyncio.ensure_future(self.client._coalesce(("k",), fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        self.assertEqual([str(result) for result in results], ["boom"] * 3)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(self.client._inflight, {})
+
+    async def test_key_is_fetched_again_after_completion(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(await self.client._coalesce(("k",), fetch), 1)
+        self.assertEqual(await self.client._coalesce(("k",), fetch), 2)
+
+
+class RenderCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.client = bc.BrowserlessClient()
+        patcher = mock.patch.object(bc.settings, "browserless_render_cache_ttl_seconds", 60.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entry_expires_after_ttl(self):
+        with mock.patch.object(bc.time, "monotonic", return_value=100.0):
+            self.client._store_cached_render(("k",), "html")
+            self.assertEqual(self.client._get_cached_render(("k",)), "html")
+        with mock.patch.object(bc.time, "monotonic", return_value=160.0):
+            self.assertIsNone(self.client._get_cached_render(("k",)))
+        self.assertNotIn(("k",), self.client._render_cache)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for index in range(32):
+            self.client._store_cached_render((index,), f"html-{index}")
+        # Reading an entry moves it to the end, so the next insert evicts key 1.
+        self.assertEqual(self.client._get_cached_render((0,)), "html-0")
+        self.client._store_cached_render((32,), "html-32")
+        self.assertEqual(len(self.client._render_cache), 32)
+        self.assertIsNone(self.client._get_cached_render((1,)))
+        self.assertEqual(self.client._get_cached_render((0,)), "html-0")
+
+    def test_empty_values_are_not_cached(self):
+        self.client._store_cached_render(("k",), "")
+        self.assertIsNone(self.client._get_cached_render(("k",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import json
+import unittest
+
+from app.scraper.instagram_scraper import InstagramScraper
+
+
+USER = {
+    "username": "jo",
+    "full_name": "Jo Doe",
+    "biography": "linha 1\nlinha 2",
+    "is_private": False,
+    "is_verified": True,
+    "edge_followed_by": {"count": 1200},
+    "edge_follow": {"count": 35},
+    "edge_owner_to_timeline_media": {"count": 7, "edges": []},
+}
+
+EXPECTED = {
+    "username": "jo",
+    "full_name": "Jo Doe",
+    "bio": "linha 1\nlinha 2",
+    "is_private": False,
+    "verified": True,
+    "follower_count": 1200,
+    "following_count": 35,
+    "post_count": 7,
+}
+
+
+class ProfileHtmlExtractionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Avoid heavy client initialization; these helpers are pure methods.
+        cls.scraper = InstagramScraper.__new__(InstagramScraper)
+
+    def test_shared_data_payload_is_decoded(self):
+        shared_data = {"entry_data": {"ProfilePage": [{"graphql": {"user": USER}}]}}
+        html = f"<script>window._sharedData = {json.dumps(shared_data)};</script>"
+        self.assertEqual(self.scraper._extract_profile_info_from_html(html), EXPECTED)
+
+    def test_regex_fallback_matches_json_payload(self):
+        # Loose fields without a "user" object go through the regex path.
+        fields = json.dumps(USER, separators=(",", ":"))[1:-1]
+        html = f"<script>{{\"props\":{{{fields}}}}}</script>"
+        self.assertEqual(self.scraper._extract_profile_info_from_html(html), EXPECTED)
+
+
+if __name__ == "__main__":
+    unittest.main()
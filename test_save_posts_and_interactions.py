@@ -0,0 +1,88 @@
+import unittest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, Interaction, InteractionType, Post, Profile
+from app.scraper.instagram_scraper import InstagramScraper
+
+
+POST_A = "https://www.instagram.com/p/a/"
+POST_B = "https://www.instagram.com/p/b/"
+
+POSTS = [
+    {"post_url": POST_A, "caption": "a", "like_count": 3},
+    {"post_url": POST_B, "caption": "b", "like_count": 5},
+]
+
+INTERACTIONS = [
+    {"type": "comment", "user_url": "https://www.instagram.com/ana/", "comment_text": "oi", "_post_url": POST_A},
+    {"type": "LIKE", "user_url": "https://www.instagram.com/bia/", "_post_url": POST_B},
+    # Duplicate of the first entry within the same payload.
+    {"type": "comment", "user_url": "https://www.instagram.com/ana/", "comment_text": "oi", "_post_url": POST_A},
+    # Without _post_url the interaction applies to every post.
+    {"type": "like", "user_url": "https://www.instagram.com/caio/"},
+    # Invalid type and missing user_url are skipped.
+    {"type": "follow", "user_url": "https://www.instagram.com/duda/", "_post_url": POST_A},
+    {"type": "like", "user_url": "  ", "_post_url": POST_A},
+]
+
+
+class SavePostsAndInteractionsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Avoid heavy client initialization; persistence only needs the helpers.
+        cls.scraper = InstagramScraper.__new__(InstagramScraper)
+
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(engine)
+        self.addCleanup(engine.dispose)
+        self.db = sessionmaker(bind=engine)()
+        self.addCleanup(self.db.close)
+        profile = Profile(instagram_username="perfil", instagram_url="https://www.instagram.com/perfil/")
+        self.db.add(profile)
+        self.db.commit()
+        self.profile_id = profile.id
+
+    def _save(self):
+        self.scraper._save_posts_and_interactions_sync(self.db, self.profile_id, POSTS, iter(INTERACTIONS))
+
+    def _interaction_keys(self):
+        rows = self.db.execute(
+            select(Interaction.post_url, Interaction.user_username, Interaction.interaction_type)
+        ).all()
+        return sorted((post_url, username, interaction_type.value) for post_url, username, interaction_type in rows)
+
+    def test_payload_is_saved_once(self):
+        self._save()
+        self.assertEqual(self.db.query(Post).count(), 2)
+        self.assertEqual(
+            self._interaction_keys(),
+            [
+                (POST_A, "ana", "comment"),
+                (POST_A, "caio", "like"),
+                (POST_B, "bia", "like"),
+                (POST_B, "caio", "like"),
+            ],
+        )
+        comment = self.db.query(Interaction).filter_by(interaction_type=InteractionType.COMMENT).one()
+        self.assertEqual(comment.comment_text, "oi")
+
+    def test_rerunning_the_same_payload_adds_nothing(self):
+        self._save()
+        post_ids = sorted(self.db.scalars(select(Post.id)).all())
+        first_run = self._interaction_keys()
+
+        self._save()
+        self.assertEqual(sorted(self.db.scalars(select(Post.id)).all()), post_ids)
+        self.assertEqual(self._interaction_keys(), first_run)
+
+
+if __name__ == "__main__":
+    unittest.main()